@@ -0,0 +1,196 @@
+"""
+Micro benchmarks for local_normalizer.PersianNormalizer stages.
+Runs over datasets/wikipedia-fa-cleaned-samples.txt and reports per-sentence latency.
+"""
+
+import random
+import re
+import sys
+import time
+
+from local_normalizer import PersianNormalizer, ZWNJ, _HA_SPECIAL_LIST, _POSTFIX_SPECIAL_LIST, normalize_arrow
+
+
+def load_sentences(file_path="./datasets/wikipedia-fa-cleaned-samples.txt"):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def time_per_sentence(fn, sentences, repeat=5):
+    """
+    Time fn over all sentences and return the best mean latency in microseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sentence in sentences:
+            fn(sentence)
+        best = min(best, time.perf_counter() - start)
+    return best / len(sentences) * 1e6
+
+
+def separate_mi_nemi_regex(verbs):
+    # The previous implementation: two alternation regexes over the whole verbs.dict
+    verbs_pattern = '|'.join(re.escape(verb) for verb in verbs)
+    mi_pattern = re.compile(r'(?<!\S)می(' + verbs_pattern + r')')
+    nemi_pattern = re.compile(r'(?<!\S)نمی(' + verbs_pattern + r')')
+
+    def separate(text):
+        text = nemi_pattern.sub(rf'نمی{ZWNJ}\1', text)
+        return mi_pattern.sub(rf'می{ZWNJ}\1', text)
+    return separate
+
+
+def benchmark_separate_mi_nemi(sentences, normalizer):
+    # run the stage on the text it actually sees inside normalize()
+    clean = PersianNormalizer(separate_mi_nemi=False, add_zwnj_mi_nemi=False, convert_space_he_je=False,
+                              join_ha_with_zwnj=False, join_postfix_specials=False, join_bi_with_zwnj=False,
+                              remove_emoji=False, convert_abbreviations=False, remove_unbalanced_brackets=False)
+    sentences = [clean.normalize(s) for s in sentences]
+
+    before = separate_mi_nemi_regex(normalizer.verbs)
+    mismatches = sum(before(s) != normalizer.separate_mi_nemi(s) for s in sentences)
+
+    print(f"separate_mi_nemi over {len(sentences)} sentences, {len(normalizer.verbs)} verbs")
+    print(f"  regex alternation: {time_per_sentence(before, sentences):8.1f} us/sentence")
+    print(f"  verb trie:         {time_per_sentence(normalizer.separate_mi_nemi, sentences):8.1f} us/sentence")
+    print(f"  mismatching outputs: {mismatches}")
+
+
+def join_suffixes_regex():
+    # The previous implementation: one re.sub per suffix, ha -> postfix -> bi
+    patterns = [(rf'\s+{ha}(?=(?:\s|[\.!\?؟،,؛()\[\]]|$))', f'{ZWNJ}{ha} ') for ha in _HA_SPECIAL_LIST]
+    patterns += [(rf'ه{ha}(\s?[!؟،؛()\[\]]?)', f'ه{ZWNJ}{ha} ') for ha in _HA_SPECIAL_LIST]
+    patterns += [(rf'\s+{postfix}(?=\s|[!؟،؛()\[\]]|$)', f'{ZWNJ}{postfix} ') for postfix in _POSTFIX_SPECIAL_LIST]
+    patterns = [(re.compile(pattern, re.MULTILINE), repl) for pattern, repl in patterns]
+    patterns.append((re.compile(r"(^|\s+)بی\s+"), f" بی{ZWNJ}"))
+
+    def join(text):
+        for pattern, repl in patterns:
+            text = pattern.sub(repl, text)
+        return text
+    return join
+
+
+def benchmark_join_suffixes(sentences, normalizer):
+    # golden check: the fused stages must give byte-identical output to the old chain
+    def fused(text):
+        text = normalizer.join_ha_with_zwnj(text)
+        text = normalizer.join_postfix_specials(text)
+        return normalizer.join_bi_with_zwnj(text)
+
+    # the corpus is already joined with ZWNJ, so also run it with the ZWNJs turned back into spaces
+    sentences = sentences + [s.replace(ZWNJ, ' ') for s in sentences]
+    before = join_suffixes_regex()
+    mismatches = sum(before(s) != fused(s) for s in sentences)
+
+    print(f"ha/postfix/bi suffix joining over {len(sentences)} sentences")
+    print(f"  one re.sub per suffix: {time_per_sentence(before, sentences):8.1f} us/sentence")
+    print(f"  fused alternations:    {time_per_sentence(fused, sentences):8.1f} us/sentence")
+    print(f"  mismatching outputs: {mismatches}")
+
+
+def clean_punctuations_regex():
+    # The previous implementation: 38 re.sub calls in a row
+    patterns = [
+        (r",", "،"),
+        (r"‘", "،"),
+        (r"’", "،"),
+        (r"'", "،"),
+        (r";", "؛"),
+        (r"/", " یا "),
+        (r"#", " هشتگ "),
+        (r"=", " برابر است با "),
+        (r"[٪%]", " درصد "),
+        (r"،\s*", "، "),
+        (r"/", " یا "),
+        (r'[*\\]', r''), # remove « , », *, /, \
+        (r'\?', r'؟'), # replace ? with ؟
+        (r' +', ' '),  # Remove multiple space
+        (r'([:؛،])\n', r'\1'),
+        (r'\s([،؟.،؛:!](?:\s|$))', r'\1'),  # remove space before punctuations
+        (r'(?<=[،؟.،؛:!])(?=\S)', r' '),   # add space after punctuations
+        (r"\s?(\(.*?\))\s?", r" \1 "),  # Add space before and after ( and )
+        (r"\s?(\{.*?\})\s?", r" \1 "),  # Add space before and after { and }
+        (r"\s?(\[.*?])\s?", r" \1 "),  # Add space before and after [ and ]
+        (r"\s?(«.*?»)\s?", r" \1 "),  # Add space before and after « and »
+        (r"\s?(‹.*?›)\s?", r" \1 "),  # Add space before and after ‹ and ›            
+        (r"\s?(-.*?-)\s?", r" \1 "),  # Add space before and after - and -
+        (r"\s?(‒.*?‒)\s?", r" \1 "),  # Add space before and after ‒ and ‒ (En Dash)
+        (r'\s?(".*?")\s?', r' \1 '),  # Add space before and after " and "
+        (r'(\s([?,.!]))|(?<=[\[(\{])(.*?)(?=[)\]\}])', lambda x: x.group().strip()),   # Remove space after & before '(' and '[' and '{'
+        (r" {2,}", " "),  # remove extra spaces
+        (r"\n{3,}", "\n\n"),  # remove extra newlines
+        (r"\n+", "\n"),
+        (r"\u200c{2,}", "\u200c"),  # remove extra ZWNJs
+        (r"\u200c{1,} ", " "),  # remove unneded ZWNJs before space
+        (r" \u200c{1,}", " "),  # remove unneded ZWNJs after space
+        (r"\b\u200c*\B", ""),  # remove unneded ZWNJs at the beginning of words
+        (r"\B\u200c*\b", ""),  # remove unneded ZWNJs at the end of words
+        (r"[ـ\r]", ""),  # remove keshide, carriage returns
+        (r" ?\.\.\.", " …"),  # replace 3 dots
+        (r"(\d)([آابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی])", r"\1 \2"), # put space after number; e.g., به طول ۹متر -> به طول ۹ متر
+        (r"([آابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی])(\d)", r"\1 \2"), # put space after number; e.g., به طول۹ -> به طول ۹
+    ]
+    patterns = [(re.compile(pattern), repl) for pattern, repl in patterns]
+
+    def clean(text):
+        for pattern, repl in patterns:
+            text = pattern.sub(repl, text)
+        return text
+    return clean
+
+
+def benchmark_clean_punctuations(sentences, normalizer, min_length=500):
+    # long lines, with some unmatched quotes and brackets the lazy (.*?) patterns rescan for
+    rng = random.Random(0)
+    long_lines = []
+    while len(long_lines) < 200:
+        line = ' '.join(rng.choice(sentences) for _ in range(rng.randint(3, 8)))
+        for mark in rng.sample('"«(-[{', 3):
+            position = rng.randrange(len(line))
+            line = line[:position] + mark + line[position:]
+        if len(line) >= min_length:
+            long_lines.append(line)
+
+    before = clean_punctuations_regex()
+    mismatches = sum(before(s) != normalizer.clean_punctuations(s) for s in sentences + long_lines)
+
+    print(f"clean_punctuations over {len(long_lines)} lines of {min_length}+ characters")
+    print(f"  38 regex rules: {time_per_sentence(before, long_lines):8.1f} us/line")
+    print(f"  merged rules:   {time_per_sentence(normalizer.clean_punctuations, long_lines):8.1f} us/line")
+    print(f"  mismatching outputs (sample corpus + long lines): {mismatches}")
+
+
+def benchmark_normalize_arrow(sentences, normalizer, copies=20):
+    import pyarrow as pa
+
+    sentences = sentences * copies
+    texts = pa.array(sentences)
+    mismatches = sum(a != b for a, b in zip(normalize_arrow(normalizer, texts).to_pylist(),
+                                            map(normalizer.normalize, sentences)))
+
+    def per_sentence(fn):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best / len(sentences) * 1e6
+
+    print(f"normalize over a pyarrow array of {len(sentences)} sentences")
+    print(f"  normalize per row: {per_sentence(lambda: [normalizer.normalize(s) for s in sentences]):8.1f} us/sentence")
+    print(f"  normalize_arrow:   {per_sentence(lambda: normalize_arrow(normalizer, texts)):8.1f} us/sentence")
+    print(f"  mismatching outputs: {mismatches}")
+
+
+if __name__ == "__main__":
+    file_path = sys.argv[1] if len(sys.argv) > 1 else "./datasets/wikipedia-fa-cleaned-samples.txt"
+    sentences = load_sentences(file_path)
+    normalizer = PersianNormalizer()
+
+    benchmark_separate_mi_nemi(sentences, normalizer)
+    benchmark_join_suffixes(sentences, normalizer)
+    benchmark_clean_punctuations(sentences, normalizer)
+    benchmark_normalize_arrow(sentences, normalizer)
+    print(f"normalize (all stages): {time_per_sentence(normalizer.normalize, sentences):8.1f} us/sentence")
@@ -0,0 +1,235 @@
+"""
+Benchmarks for phonemize_fa.
+Runs over datasets/wikipedia-fa-cleaned-samples.txt with a deterministic stand-in phonemizer,
+so no vaguye install is needed; its per-call cost is configurable. With --phonemizer vaguye
+the real one is measured instead.
+
+Throughput results can be saved as a JSON baseline and later runs compared against it:
+    python benchmark_phonemize.py --save-baseline benchmark_baseline.json
+    python benchmark_phonemize.py --baseline benchmark_baseline.json
+benchmark_baseline.json in the repo holds the stand-in results (default --cost) on the sample
+sentences; re-save it on the machine and with the tokenizer you compare with, rates depend on
+both. A baseline of another setup (phonemizer, cost, sentences, tokenizer) is an error.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import phonemize_fa
+
+
+class StandInPhonemizer:
+    """
+    Deterministic replacement for the vaguye PersianPhonemizer.
+    Maps every letter to a fixed symbol and busy-waits cost seconds per call, like a real phonemizer would.
+    """
+
+    _SYMBOLS = str.maketrans("ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهیآ", "Abptsj4hxdzrzZsSsztz?qfqkglmnuhiA")
+
+    def __init__(self, cost=0.0005):
+        self.cost = cost
+        self.calls = 0
+
+    def phonemize(self, word):
+        self.calls += 1
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+        return word.translate(self._SYMBOLS)
+
+
+def load_sentences(file_path="./datasets/wikipedia-fa-cleaned-samples.txt"):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def load_tokenizer(name_or_vocab):
+    """A BertTokenizer from the hub (or a local directory), or from a plain vocab.txt file."""
+    from transformers import BertTokenizer
+    if name_or_vocab.endswith('.txt'):
+        # named after the file, so results and baselines record which vocab was used
+        return BertTokenizer(name_or_vocab, name_or_path=name_or_vocab)
+    return BertTokenizer.from_pretrained(name_or_vocab)
+
+
+def use_phonemizer(name, cost=0.0005):
+    """
+    Make phonemize_fa use the stand-in ('stand-in') or the real vaguye phonemizer ('vaguye'),
+    without a lexicon or shared cache, so only the phonemizer itself is measured.
+    """
+    if name == 'vaguye':
+        from vaguye import PersianPhonemizer
+        phonemize_fa.set_phonemizer(PersianPhonemizer())
+    else:
+        phonemize_fa.set_phonemizer(StandInPhonemizer(cost))
+    phonemize_fa.set_lexicon(None)
+    phonemize_fa.set_shared_cache(None)
+
+
+def benchmark_throughput(sentences, tokenizer, phonemizer='stand-in', cost=0.0005, repeat=3):
+    """
+    Throughput of phonemize_fa.phonemize over sentences with cold caches (best of repeat runs),
+    and how the time splits between normalization, tokenization, phonemizer calls and distributing
+    the phonemes over the tokens.
+
+    Returns:
+        JSON-serializable results, see compare_baseline
+    """
+    use_phonemizer(phonemizer, cost)
+    words = sum(len(phonemize_fa.get_normalizer().normalize(text).split()) for text in sentences)
+
+    best = float('inf')
+    for _ in range(repeat):
+        phonemize_fa.clear_caches()
+        start = time.perf_counter()
+        expected = [phonemize_fa.phonemize(text, tokenizer) for text in sentences]
+        best = min(best, time.perf_counter() - start)
+
+    stages = None
+    for _ in range(repeat):
+        times, results = phonemize_fa.profile_phonemize(sentences, tokenizer)
+        if stages is None or sum(times.values()) < sum(stages.values()):
+            stages = times
+    mismatches = sum(a != b for a, b in zip(results, expected))
+
+    total = sum(stages.values())
+    print(f"phonemize over {len(sentences)} sentences, {words} words, {phonemizer} phonemizer"
+          + (f" ({cost * 1e3:.2f} ms per call)" if phonemizer == 'stand-in' else ""))
+    print(f"  {len(sentences) / best:10.1f} sentences/s")
+    print(f"  {words / best:10.1f} words/s")
+    for name, seconds in stages.items():
+        print(f"  {name:10s} {seconds * 1e3:9.1f} ms  {seconds / total:6.1%}")
+    print(f"  mismatching outputs (stages vs phonemize): {mismatches}")
+
+    return {
+        'phonemizer': phonemizer,
+        'cost': cost if phonemizer == 'stand-in' else None,
+        'sentences': len(sentences),
+        'words': words,
+        'tokenizer': tokenizer.name_or_path,
+        'vocab_size': len(tokenizer),
+        'sentences_per_sec': len(sentences) / best,
+        'words_per_sec': words / best,
+        'stage_seconds': stages,
+        'python': platform.python_version(),
+    }
+
+
+def compare_baseline(results, baseline_path, tolerance=0.1):
+    """
+    Compare results with a saved baseline and print the change of every rate.
+
+    Returns:
+        True if throughput dropped by more than tolerance (a fraction) below the baseline
+
+    Raises:
+        ValueError: if the baseline was measured on a different setup (phonemizer, cost, sentences, tokenizer)
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    setup = ('phonemizer', 'cost', 'sentences', 'words', 'tokenizer', 'vocab_size')
+    different = [key for key in setup if baseline.get(key) != results[key]]
+    if different:
+        raise ValueError(f"Baseline {baseline_path} was measured on a different setup: "
+                         + ", ".join(f"{key}={baseline.get(key)!r} (now {results[key]!r})" for key in different)
+                         + "; re-save it with --save-baseline")
+
+    regressed = False
+    print(f"Compared with {baseline_path}:")
+    for key in ('sentences_per_sec', 'words_per_sec'):
+        change = results[key] / baseline[key] - 1
+        print(f"  {key:18s} {baseline[key]:10.1f} -> {results[key]:10.1f}  {change:+7.1%}")
+        regressed |= change < -tolerance
+    for name, seconds in results['stage_seconds'].items():
+        before = baseline['stage_seconds'].get(name)
+        if before:
+            print(f"  {name:18s} {before * 1e3:8.1f} ms -> {seconds * 1e3:8.1f} ms  {seconds / before - 1:+7.1%}")
+    if regressed:
+        print(f"  REGRESSION: throughput more than {tolerance:.0%} below the baseline")
+    return regressed
+
+
+# Per pool worker: the tokenizer and the stand-in phonemizer, set up by _init_worker
+_worker_tokenizer = None
+
+
+def _init_worker(tokenizer, cost, shared_cache_path):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+    phonemize_fa.set_phonemizer(StandInPhonemizer(cost))
+    phonemize_fa.set_shared_cache(shared_cache_path)
+
+
+def _process_shard(sentences, batch_size=1000):
+    # like process_shard in preprocess_fa.ipynb; returns the phonemizer calls this shard made
+    phonemizer = phonemize_fa.get_phonemizer()
+    calls = phonemizer.calls
+    for i in range(0, len(sentences), batch_size):
+        phonemize_fa.phonemize_batch(sentences[i:i + batch_size], _worker_tokenizer)
+    return phonemizer.calls - calls
+
+
+def benchmark_shared_cache(sentences, tokenizer, workers=4, shards=32, shard_size=500, cost=0.0005, seed=0):
+    """
+    Total time to phonemize a sharded corpus with a pool of workers, with only the per-process
+    word caches vs. additionally sharing phonemes through a SharedPhonemeCache sqlite file.
+    Shards are drawn from the sample sentences, so frequent words recur across shards and workers.
+    """
+    rng = random.Random(seed)
+    corpus = [[rng.choice(sentences) for _ in range(shard_size)] for _ in range(shards)]
+    unique_words = len({word for text in sentences for word in phonemize_fa.get_normalizer().normalize(text).split()})
+
+    print(f"{shards} shards x {shard_size} sentences, {workers} workers, {cost * 1e3:.2f} ms per phonemizer call, "
+          f"{unique_words} distinct words")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, shared_cache_path in (('per-process caches', None),
+                                        ('shared sqlite cache', os.path.join(directory, 'phonemes.sqlite'))):
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(tokenizer, cost, shared_cache_path)) as pool:
+                calls = sum(pool.map(_process_shard, corpus))
+            elapsed = time.perf_counter() - start
+            print(f"  {name:20s} {elapsed:7.2f} s total, {calls:7d} phonemizer calls")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark phonemize_fa with a stand-in phonemizer.")
+    parser.add_argument('--sentences', default="./datasets/wikipedia-fa-cleaned-samples.txt")
+    parser.add_argument('--tokenizer', default="HooshvareLab/bert-base-parsbert-uncased",
+                        help="hub name, local directory or vocab.txt file")
+    parser.add_argument('--phonemizer', choices=('stand-in', 'vaguye'), default='stand-in',
+                        help="the deterministic stand-in, or the real vaguye phonemizer if installed")
+    parser.add_argument('--cost', type=float, default=0.0005, help="seconds per stand-in phonemizer call")
+    parser.add_argument('--baseline', default=None, help="JSON baseline to compare the throughput with")
+    parser.add_argument('--save-baseline', default=None, help="write the throughput results to this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed throughput drop vs. the baseline")
+    parser.add_argument('--shared-cache', action='store_true', help="also benchmark the shared sqlite cache")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--shards', type=int, default=32)
+    args = parser.parse_args()
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} not found (create it with --save-baseline)")
+
+    sentences = load_sentences(args.sentences)
+    tokenizer = load_tokenizer(args.tokenizer)
+    results = benchmark_throughput(sentences, tokenizer, phonemizer=args.phonemizer, cost=args.cost)
+    regressed = False
+    if args.baseline:
+        try:
+            regressed = compare_baseline(results, args.baseline, tolerance=args.tolerance)
+        except ValueError as e:
+            raise SystemExit(f"ERROR: {e}")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.shared_cache:
+        benchmark_shared_cache(sentences, tokenizer, workers=args.workers, shards=args.shards, cost=args.cost)
+    raise SystemExit(1 if regressed else 0)
@@ -16,6 +16,7 @@ import torch.nn.functional as F
 from torch.utils.data import DataLoader
 
 from text_utils import TextCleaner
+from phoneme_arrays import PhonemeArrays, encode_phonemes
 
 import logging
 logger = logging.getLogger(__name__)
@@ -49,11 +50,18 @@ class FilePathDataset(torch.utils.data.Dataset):
         
         with open(token_maps, 'rb') as handle:
             self.token_maps = pickle.load(handle)     
+
+        # symbol ids for PhonemeArrays datasets, whose phonemes are already encoded
+        self.space_id = encode_phonemes(" ")[0]
+        self.token_separator_id = encode_phonemes(token_separator)[0]
+        self.token_mask_id = encode_phonemes(token_mask)[0]
             
     def __len__(self):
         return len(self.data)
 
     def __getitem__(self, idx):
+        if isinstance(self.data, PhonemeArrays):
+            return self._getitem_arrays(idx)
 
         phonemes = self.data[idx]['phonemes']
         input_ids = self.data[idx]['input_ids']
@@ -115,6 +123,60 @@ class FilePathDataset(torch.utils.data.Dataset):
         words = torch.LongTensor(words)
         
         return phonemes, words, labels, masked_index
+
+    def _getitem_arrays(self, idx):
+        # __getitem__ on the symbol ids of a PhonemeArrays sentence: same random draws in the
+        # same order, so the same samples, without joining and re-encoding strings per character
+        sentence = self.data[idx]
+        symbols = sentence['symbols']
+        token_ends = sentence['token_ends']
+        lengths = token_ends.astype(np.int64)
+        lengths[1:] -= token_ends[:-1]
+
+        # every token is followed by a separator
+        separators = token_ends + np.arange(len(token_ends))
+        starts = (separators - lengths).tolist()
+        mel_length = len(symbols) + len(token_ends)
+
+        is_symbol = np.ones(mel_length, dtype=bool)
+        is_symbol[separators] = False
+        labels = np.empty(mel_length, dtype=np.int64)
+        labels[is_symbol] = symbols
+        labels[separators] = self.space_id
+        phoneme = labels.copy()
+        phoneme[separators] = self.token_separator_id
+
+        # map each token's word id once, then spread it over the token's symbols
+        words = [self.token_maps.get(w, {'token': 0})['token'] for w in sentence['input_ids'].tolist()]
+        words = np.repeat(np.array(words, dtype=np.int64), lengths + 1)
+        words[separators] = self.token_maps.get(self.word_separator, {'token': 0})['token']
+
+        masked_index = []
+        for start, length in zip(starts, lengths.tolist()):
+            if np.random.rand() < self.word_mask_prob:
+                if np.random.rand() < self.replace_prob:
+                    if np.random.rand() < (self.phoneme_mask_prob / self.replace_prob): 
+                        phoneme[start:start + length] = [symbols[np.random.randint(0, len(symbols))] for _ in range(length)]  # randomized
+                else:
+                    phoneme[start:start + length] = self.token_mask_id # masked
+
+                masked_index.extend(range(start, start + length))
+
+        masked_idx = np.array(masked_index)
+        masked_index = []
+        if mel_length > self.max_mel_length:
+            random_start = np.random.randint(0, mel_length - self.max_mel_length)
+            phoneme = phoneme[random_start:random_start + self.max_mel_length]
+            words = words[random_start:random_start + self.max_mel_length]
+            labels = labels[random_start:random_start + self.max_mel_length]
+            
+            for m in masked_idx:
+                if m >= random_start and m < random_start + self.max_mel_length:
+                    masked_index.append(m - random_start)
+        else:
+            masked_index = masked_idx
+
+        return torch.from_numpy(phoneme), torch.from_numpy(words), torch.from_numpy(labels), masked_index
         
 class Collater(object):
     """
@@ -3,9 +3,12 @@ Persian dataset loader for PL-BERT training.
 Loads Persian Wikipedia from a text file and converts to HuggingFace Dataset format.
 """
 
-from datasets import Dataset
+from datasets import Dataset, Features, Value
+import hashlib
 import os
 
+from local_normalizer import PersianNormalizer, normalize_arrow
+
 
 def load_persian_wikipedia(file_path="./datasets/wikipedia-fa-cleaned.txt"):
     """
@@ -39,9 +42,133 @@ def load_persian_wikipedia(file_path="./datasets/wikipedia-fa-cleaned.txt"):
     return dataset
 
 
+def _sentence_key(text, normalize_whitespace):
+    if normalize_whitespace:
+        text = ' '.join(text.split())
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def deduplicate_sentences(texts, normalize_whitespace=False):
+    """
+    Drop repeated sentences, keeping the first occurrence of each, as a stream.
+    Two passes over texts: the first counts the sentences, the second yields the first
+    occurrences. Only a 16-byte hash and a count per unique sentence stay in memory.
+
+    Args:
+        texts: iterable of strings that can be iterated twice (a list, not a generator)
+        normalize_whitespace: also count sentences that differ only in whitespace as duplicates
+
+    Yields:
+        (text, number of occurrences) for every unique sentence, in order of first occurrence
+    """
+    if iter(texts) is texts:
+        raise TypeError("deduplicate_sentences reads texts twice, pass a list or another re-iterable, not an iterator")
+    counts = {}
+    for text in texts:
+        key = _sentence_key(text, normalize_whitespace)
+        counts[key] = counts.get(key, 0) + 1
+    for text in texts:
+        count = counts.pop(_sentence_key(text, normalize_whitespace), None)
+        if count is not None:
+            yield text, count
+
+
+class _DatasetColumn:
+    # re-iterable view of one column of a Dataset, read batch by batch
+    def __init__(self, dataset, column, batch_size):
+        self.dataset = dataset
+        self.column = column
+        self.batch_size = batch_size
+
+    def __iter__(self):
+        for batch in self.dataset.iter(batch_size=self.batch_size):
+            yield from batch[self.column]
+
+
+def _unique_rows(dataset, column, normalize_whitespace, batch_size):
+    for text, count in deduplicate_sentences(_DatasetColumn(dataset, column, batch_size), normalize_whitespace):
+        yield {column: text, "count": count}
+
+
+def deduplicate_dataset(dataset, column="text", normalize_whitespace=False, batch_size=10000):
+    """
+    Deduplicate the sentences of a HuggingFace Dataset (e.g. from load_persian_wikipedia), so each
+    is normalized, tokenized and phonemized once. The 'count' column keeps how often a sentence
+    occurred and survives phonemization (Dataset.map), but FilePathDataset and PhonemeArrayWriter
+    do not use it: training on the result sees each sentence once, not weighted by its count.
+
+    The unique sentences are streamed to a new Arrow dataset (Dataset.from_generator), so memory
+    holds only the per-sentence hashes of deduplicate_sentences, not the texts.
+
+    Args:
+        dataset: HuggingFace Dataset, read batch by batch (twice)
+        column: name of the string column to deduplicate on
+        normalize_whitespace: see deduplicate_sentences
+        batch_size: rows read at a time
+
+    Returns:
+        HuggingFace Dataset with the column and 'count' (other columns are dropped)
+    """
+    features = Features({column: Value("string"), "count": Value("int64")})
+    unique = Dataset.from_generator(_unique_rows, features=features,
+                                    gen_kwargs={"dataset": dataset, "column": column,
+                                                "normalize_whitespace": normalize_whitespace,
+                                                "batch_size": batch_size})
+    print(f"Deduplicated {len(dataset)} sentences to {len(unique)} unique ({len(dataset) - len(unique)} duplicates)")
+    return unique
+
+
+def _normalize_table(batch, normalizer, column):
+    index = batch.schema.get_field_index(column)
+    return batch.set_column(index, column, normalize_arrow(normalizer, batch.column(column)))
+
+
+def normalize_dataset(dataset, column="text", num_proc=None, normalizer=None, batch_size=1000):
+    """
+    Normalize a text column of a HuggingFace Dataset with local_normalizer.
+
+    Works on whole Arrow record batches (Dataset.map with batched=True): the character-level
+    stages run as pyarrow compute kernels and only the context-sensitive ones per row in Python,
+    see local_normalizer.normalize_arrow. The output matches normalizer.normalize row by row.
+
+    Args:
+        dataset: HuggingFace Dataset, e.g. from load_persian_wikipedia
+        column: name of the string column to normalize
+        num_proc: number of processes for Dataset.map (None for the current process)
+        normalizer: PersianNormalizer to use (default: PersianNormalizer())
+        batch_size: rows per record batch
+
+    Returns:
+        HuggingFace Dataset with the column normalized, in the format of the input dataset
+    """
+    if normalizer is None:
+        normalizer = PersianNormalizer()
+
+    normalized = dataset.with_format("arrow").map(
+        _normalize_table,
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc,
+        fn_kwargs={"normalizer": normalizer, "column": column},
+        desc="Normalizing",
+    )
+    return normalized.with_format(dataset.format["type"])
+
+
 if __name__ == "__main__":
     # Test the loader
     dataset = load_persian_wikipedia()
     print(f"\nFirst 3 examples:")
     for i in range(min(3, len(dataset))):
         print(f"{i+1}. {dataset[i]['text'][:100]}...")
+
+    deduplicated = deduplicate_dataset(dataset, normalize_whitespace=True)
+    most_repeated = sorted(range(len(deduplicated)), key=lambda i: -deduplicated[i]['count'])[:3]
+    print(f"\nMost repeated sentences:")
+    for i in most_repeated:
+        print(f"{deduplicated[i]['count']}x {deduplicated[i]['text'][:100]}...")
+
+    normalized = normalize_dataset(dataset.select(range(min(1000, len(dataset)))))
+    print(f"\nFirst 3 normalized examples:")
+    for i in range(min(3, len(normalized))):
+        print(f"{i+1}. {normalized[i]['text'][:100]}...")
@@ -1,6 +1,18 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
 import re
+import sqlite3
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Sequence
 from importlib import resources
 from num2fawords import words, ordinal_words
 
@@ -8,6 +20,785 @@ ZWNJ = chr(0x200C)    # تعریف نیم فاصله
 
 currentpath = Path(__file__).resolve().parent
 
+# Bump whenever a rule changes the output, so NormalizationCache entries of older rules are not reused
+RULES_VERSION = 1
+
+
+# constructor flags of PersianNormalizer, in signature order
+_OPTION_NAMES = (
+    'correct_spacing', 'persian_numbers', 'separate_mi_nemi', 'add_zwnj_mi_nemi', 'convert_space_he_je',
+    'join_ha_with_zwnj', 'convert_dates_to_words', 'convert_numbers_to_words', 'join_bi_with_zwnj',
+    'clean_punctuations', 'remove_emoji', 'join_postfix_specials', 'convert_abbreviations',
+    'remove_unbalanced_brackets', 'separate_merged_numbers',
+)
+
+# Built-in stages in their default order, with the constructor flag that enables each
+_DEFAULT_STAGE_FLAGS = (
+    ('persian_number', 'persian_numbers'),
+    ('convert_dates_to_words', 'convert_dates_to_words'),
+    # Convert numbers to words BEFORE cleaning punctuations
+    # This ensures negative numbers are handled before hyphen processing
+    ('convert_numbers_to_words', 'convert_numbers_to_words'),
+    ('clean_punctuations', 'clean_punctuations'),
+    ('separate_merged_numbers', 'separate_merged_numbers'),
+    ('separate_mi_nemi', 'separate_mi_nemi'),
+    ('join_mi_nemi_with_zwnj', 'add_zwnj_mi_nemi'),
+    ('convert_space_he_je', 'convert_space_he_je'),
+    ('join_ha_with_zwnj', 'join_ha_with_zwnj'),
+    ('join_postfix_specials', 'join_postfix_specials'),
+    ('join_bi_with_zwnj', 'join_bi_with_zwnj'),
+    ('remove_emoji', 'remove_emoji'),
+    # ('separate_he_eed', 'separate_he_eed'),
+    ('convert_abbreviations_to_text', 'convert_abbreviations'),
+    ('remove_unbalanced_brackets', 'remove_unbalanced_brackets'),
+)
+DEFAULT_STAGES = tuple(name for name, _ in _DEFAULT_STAGE_FLAGS)
+
+# Custom stages added with register_stage, name -> stage(normalizer, text) -> text
+_STAGE_REGISTRY = {}
+# and their versions, name -> version (None: unversioned, never cached)
+_STAGE_VERSIONS = {}
+
+
+def _compile_patterns(patterns, flags=0):
+    # compile (pattern, replacement) pairs once, so normalize() only runs pattern.sub per sentence
+    return tuple((re.compile(pattern, flags), repl) for pattern, repl in patterns)
+
+
+def _apply_patterns(text: str, patterns, counts: Counter = None) -> str:
+    # counts (profiling only) collects the substitutions of every rule, keyed by its pattern
+    if counts is None:
+        for pattern, repl in patterns:
+            text = pattern.sub(repl, text)
+        return text
+    for pattern, repl in patterns:
+        text, substitutions = pattern.subn(repl, text)
+        if substitutions:
+            counts[pattern.pattern] += substitutions
+    return text
+
+
+def _sub(pattern, repl, text: str, counts: Counter = None) -> str:
+    # pattern.sub, counting its substitutions when profiling (see _apply_patterns)
+    if counts is None:
+        return pattern.sub(repl, text)
+    text, substitutions = pattern.subn(repl, text)
+    if substitutions:
+        counts[pattern.pattern] += substitutions
+    return text
+
+
+def _count_change(counts: Counter, rule: str, text_in: str, text_out: str) -> str:
+    # for rules that are not a single regex (translations, scanners): one count per changed sentence
+    if counts is not None and text_in != text_out:
+        counts[rule] += 1
+    return text_out
+
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_HTML_PATTERNS = _compile_patterns([
+    (r'<[^>]+>', ' '),  # Remove HTML tags
+    (r'http\S+', ' '),  # Remove URLs
+    (r'www\.\S+', ' '),
+    (r'\S+@\S+', ' '),  # Remove emails
+])
+
+# Arabic and presentation-form letters to their Persian forms, shared by every normalizer
+_TRANSLATION_SRC = "ؠػػؽؾؿكيٮٯٷٸٹٺٻټٽٿڀځٵٶٷٸٹٺٻټٽٿڀځڂڅڇڈډڊڋڌڍڎڏڐڑڒړڔڕږڗڙښڛڜڝڞڟڠڡڢڣڤڥڦڧڨڪګڬڭڮڰڱڲڳڴڵڶڷڸڹںڻڼڽھڿہۂۃۄۅۆۇۈۉۊۋۏۍێېۑےۓەۮۯۺۻۼۿݐݑݒݓݔݕݖݗݘݙݚݛݜݝݞݟݠݡݢݣݤݥݦݧݨݩݪݫݬݭݮݯݰݱݲݳݴݵݶݷݸݹݺݻݼݽݾݿࢠࢡࢢࢣࢤࢥࢦࢧࢨࢩࢪࢫࢮࢯࢰࢱࢬࢲࢳࢴࢶࢷࢸࢹࢺࢻࢼࢽﭐﭑﭒﭓﭔﭕﭖﭗﭘﭙﭚﭛﭜﭝﭞﭟﭠﭡﭢﭣﭤﭥﭦﭧﭨﭩﭮﭯﭰﭱﭲﭳﭴﭵﭶﭷﭸﭹﭺﭻﭼﭽﭾﭿﮀﮁﮂﮃﮄﮅﮆﮇﮈﮉﮊﮋﮌﮍﮎﮏﮐﮑﮒﮓﮔﮕﮖﮗﮘﮙﮚﮛﮜﮝﮞﮟﮠﮡﮢﮣﮤﮥﮦﮧﮨﮩﮪﮫﮬﮭﮮﮯﮰﮱﺀﺁﺃﺄﺅﺆﺇﺈﺉﺊﺋﺌﺍﺎﺏﺐﺑﺒﺕﺖﺗﺘﺙﺚﺛﺜﺝﺞﺟﺠﺡﺢﺣﺤﺥﺦﺧﺨﺩﺪﺫﺬﺭﺮﺯﺰﺱﺲﺳﺴﺵﺶﺷﺸﺹﺺﺻﺼﺽﺾﺿﻀﻁﻂﻃﻄﻅﻆﻇﻈﻉﻊﻋﻌﻍﻎﻏﻐﻑﻒﻓﻔﻕﻖﻗﻘﻙﻚﻛﻜﻝﻞﻟﻠﻡﻢﻣﻤﻥﻦﻧﻨﻩﻪﻫﻬﻭﻮﯽﻯﻰﻱﻲﯿﻳﯾﻴىكي“” "
+_TRANSLATION_DST = ('یککیییکیبقویتتبتتتبحاوویتتبتتتبحححچدددددددددررررررررسسسصصطعففففففققکککککگگگگگللللنننننهچهههوووووووووییییییهدرشضغهبببببببححددرسعععففکککممنننلررسححسرحاایییووییحسسکببجطفقلمییرودصگویزعکبپتریفقنااببببپپپپببببتتتتتتتتتتتتففففححححححححچچچچچچچچددددددددژژررککککگگگگگگگگگگگگننننننههههههههههییییءاااووااییییااببببتتتتثثثثججججححححخخخخددذذررززسسسسششششصصصصضضضضططططظظظظععععغغغغففففققققککککللللممممننننههههووییییییییییکی"" ')
+_TRANSLATIONS = str.maketrans(_TRANSLATION_SRC, _TRANSLATION_DST)
+
+_PERSIAN_NUMBER_TRANSLATIONS = str.maketrans("0123456789%٠١٢٣٤٥٦٧٨٩", "۰۱۲۳۴۵۶۷۸۹٪۰۱۲۳۴۵۶۷۸۹")
+
+_MI_NEMI_PATTERNS = _compile_patterns([
+    (r"^می\s+", f"می{ZWNJ}"),
+    (r"\s+می\s+", f" می{ZWNJ}"),
+    (r"^نمی\s+", f"نمی{ZWNJ}"),
+    (r"\s+نمی\s+", f" نمی{ZWNJ}"),
+])
+
+# Word-initial می / نمی, checked against the verb trie by _VerbMatcher
+_MI_NEMI_PREFIX_PATTERN = re.compile(r'(?<!\S)(?:نمی|می)')
+_VERB_END = ''  # trie key marking the end of a verb (never a single character)
+
+_HE_JE_PATTERNS = _compile_patterns([
+    (r"ه\s+ی\s+", "ۀ "), # replacement of ی with ۀ
+    (rf"ه{ZWNJ}ی\s+", "ۀ "), # replacement of ی with ۀ
+], re.MULTILINE)
+
+_HA_SPECIAL_LIST = [
+    "هایمان", "هایم", "هایت", "هایش", "هایتان", "هایشان", "هام", "هات", "هاتان",
+    "هامون", "هامان", "هاش", "هاتون", "هاشان", "هاشون", "هایی", "های", "هاس", "ها", "هاست", "هاشو"
+]
+# Every suffix family is a single alternation in list order (not longest first): the old chain applied
+# one pattern per suffix in this order, and _join_suffix_tokens reproduces its output exactly.
+_HA_SUFFIX_PATTERN = re.compile(
+    r'\s+(' + '|'.join(_HA_SPECIAL_LIST) + r')(?=(?:\s|[\.!\?؟،,؛()\[\]]|$))', re.MULTILINE
+)
+_HA_SUFFIX_RANKS = {ha: rank for rank, ha in enumerate(_HA_SPECIAL_LIST)}
+_HA_AFTER_HE_PATTERN = re.compile(r'ه(' + '|'.join(_HA_SPECIAL_LIST) + r')(\s?[!؟،؛()\[\]]?)')
+
+_DATE_PATTERN = re.compile(r'\d{2,4}/\d{1,2}/\d{1,2}')  # Matches dates (e.g., 1402/11/29)
+# Pattern that matches optional negative sign followed by number
+# The negative lookbehind (?<![آ-ی]) ensures - is not preceded by Persian characters
+# This prevents matching - in ایرانی-آمریکایی
+_NUMBER_PATTERN = re.compile(r'(?<![آ-ی])-?\d*\.?\d+')  # Matches integers, floats, and negative numbers
+
+# Years, percentages and small integers repeat a lot in Wikipedia, so their spelled-out forms are cached
+NUMBER_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def _date_to_words(date: str) -> str:
+    parts = date.split('/')
+    day = ordinal_words(parts[2])
+    month = words(parts[1])
+    year = words(parts[0])
+    return f"{day}ِ {month}ِ {year}"
+
+
+@lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def _number_to_words(num: str) -> str:
+    if num.startswith('-'):
+        # Handle negative numbers
+        return f"منفی " + words(num[1:])  # Remove - and add منفی prefix
+    return words(num) # num2fawords returns words separated by spaces, which is what we want now
+
+
+def _replace_date(match) -> str:
+    return _date_to_words(match.group())
+
+
+def _replace_number(match) -> str:
+    return _number_to_words(match.group())
+
+
+_ONES = ["صفر", "یک", "دو", "سه", "چهار", "پنج", "شش", "هفت", "هشت", "نه"]
+_TEENS = ["ده", "یازده", "دوازده", "سیزده", "چهارده", "پانزده", "شانزده", "هفده", "هجده", "نوزده"]
+_TENS = ["بیست", "سی", "چهل", "پنجاه", "شصت", "هفتاد", "هشتاد", "نود"]
+_HUNDREDS = ["صد", "یکصد", "دویست", "سیصد", "چهارصد", "پانصد", "ششصد", "هفتصد", "هشتصد", "نهصد"]
+_SCALES = ["هزار", "میلیون", "میلیارد", "بیلیون", "تریلیون", "کوادریلیون"]
+_NUMBER_CONNECTIVES = ["و", "منفی", "ممیز"]
+
+# Number words as phonemize_fa sees them, and with the connectives used inside numbers
+NUMBER_WORDS = frozenset(_ONES + _TEENS + _TENS + _HUNDREDS + _SCALES)
+_MERGED_NUMBER_WORDS = NUMBER_WORDS | frozenset(_NUMBER_CONNECTIVES)
+
+
+def _merged_numbers_pattern(words):
+    # A ZWNJ is split iff a number word ends right before it and another one starts right after it.
+    # Words contain no ZWNJ or space, so this holds independently for every ZWNJ, which is what the
+    # old repeat-until-stable (word)ZWNJ(word) substitution converged to. Lookbehinds must have a
+    # fixed width, so there is one per word length.
+    words = sorted(words, key=lambda w: (-len(w), w))
+    lengths = sorted({len(w) for w in words}, reverse=True)
+    behind = "|".join(
+        "(?<=" + "|".join(re.escape(w) for w in words if len(w) == length) + ")" for length in lengths
+    )
+    ahead = "|".join(re.escape(w) for w in words)
+    return re.compile(rf'(?:{behind}){ZWNJ}(?={ahead})')
+
+
+_MERGED_NUMBERS_PATTERN = _merged_numbers_pattern(_MERGED_NUMBER_WORDS)
+
+_BI_PATTERNS = _compile_patterns([
+    (r"(^|\s+)بی\s+", f" بی{ZWNJ}"),
+])
+
+# clean_punctuations used to be 38 re.sub calls in a row. They are order dependent (e.g. "،\s*" must see
+# a "*" before it is removed), so the stage keeps their order but merges the rules that provably
+# commute, gates rules on a cheap substring test and replaces the lazy bracket patterns with linear scans.
+_PUNCTUATION_TRANSLATIONS = str.maketrans({
+    ",": "،", "‘": "،", "’": "،", "'": "،", ";": "؛",
+    "/": " یا ", "#": " هشتگ ", "=": " برابر است با ", "٪": " درصد ", "%": " درصد ",
+})
+_PUNCTUATION_CHARS = frozenset(",‘’';/#=٪%")
+_COMMA_SPACING_PATTERN = re.compile(r"،\s*")
+_MARK_TRANSLATIONS = str.maketrans({"*": None, "\\": None, "?": "؟"})  # remove *, \ and replace ? with ؟
+_MARK_CHARS = frozenset("*\\?")
+_PUNCTUATION_NEWLINE_PATTERN = re.compile(r'([:؛،])\n')
+_SPACE_BEFORE_PUNCTUATION_PATTERN = re.compile(r'\s([،؟.،؛:!](?:\s|$))')  # remove space before punctuations
+_SPACE_AFTER_PUNCTUATION_PATTERN = re.compile(r'(?<=[،؟.،؛:!])(?=\S)')  # add space after punctuations
+_SPACE_BEFORE_PUNCTUATION_CHARS = frozenset('،؟.؛:!')
+_SPACED_PAIRS = (
+    ('(', ')'),  # Add space before and after ( and )
+    ('{', '}'),
+    ('[', ']'),
+    ('«', '»'),
+    ('‹', '›'),
+    ('-', '-'),
+    ('‒', '‒'),  # En Dash
+    ('"', '"'),
+)
+_STRIP_OPENERS = '[({'
+_STRIP_OPENERS_PATTERN = re.compile(r'[\[({]')
+_NEWLINE_PATTERN = re.compile(r'\n')
+_STRIP_CLOSERS_PATTERN = re.compile(r'[)\]}]')
+_SPACE_BEFORE_MARK_PATTERN = re.compile(r'\s([?,.!])')
+# with the rule names profiling reports them under
+_SPACED_PAIR_RULES = tuple((opener, closer, f'space around {opener}{closer}') for opener, closer in _SPACED_PAIRS)
+_EXTRA_SPACES_PATTERN = re.compile(r" {2,}")
+_NEWLINES_PATTERN = re.compile(r"\n+")
+_ZWNJ_PATTERNS = _compile_patterns([
+    (r"\u200c{2,}", "\u200c"),  # remove extra ZWNJs
+    (r"\u200c{1,} ", " "),  # remove unneded ZWNJs before space
+    (r" \u200c{1,}", " "),  # remove unneded ZWNJs after space
+    # these two were written with \u200c*, whose empty matches at every word boundary changed nothing
+    (r"\b\u200c+\B", ""),  # remove unneded ZWNJs at the beginning of words
+    (r"\B\u200c+\b", ""),  # remove unneded ZWNJs at the end of words
+])
+_KESHIDE_PATTERN = re.compile(r"[ـ\r]")  # remove keshide, carriage returns
+_THREE_DOTS_PATTERN = re.compile(r" ?\.\.\.")
+_DIGIT_PATTERN = re.compile(r"\d")
+_DIGIT_SPACING_PATTERNS = _compile_patterns([
+    (r"(\d)([آابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی])", r"\1 \2"), # put space after number; e.g., به طول ۹متر -> به طول ۹ متر
+    (r"([آابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی])(\d)", r"\1 \2"), # put space after number; e.g., به طول۹ -> به طول ۹
+])
+
+
+def _space_around_pairs(text: str, opener: str, closer: str) -> str:
+    """
+    Linear version of re.sub(r'\s?(O.*?C)\s?', r' \1 ', text).
+    The lazy regex rescans to the end of the line for every opener that is never closed.
+    """
+    start = text.find(opener)
+    if start < 0:
+        return text
+
+    pieces = []
+    last = 0
+    while start >= 0:
+        line_end = text.find('\n', start + 1)  # '.' does not cross newlines
+        if line_end < 0:
+            line_end = len(text)
+        end = text.find(closer, start + 1, line_end)
+        if end < 0:
+            # no closer left on this line, so no later opener on it can match either
+            start = text.find(opener, line_end)
+            continue
+        match_start = start - 1 if start > last and text[start - 1].isspace() else start
+        match_end = end + 1
+        if match_end < len(text) and text[match_end].isspace():
+            match_end += 1
+        pieces.append(text[last:match_start])
+        pieces.append(' ' + text[start:end + 1] + ' ')
+        last = match_end
+        start = text.find(opener, last)
+
+    if not pieces:
+        return text
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+def _strip_bracket_contents(text: str) -> str:
+    """
+    Linear version of
+    re.sub(r'(\s([?,.!]))|(?<=[\[(\{])(.*?)(?=[)\]\}])', lambda x: x.group().strip(), text),
+    which removes the space before . and ! and strips the text right after an opening bracket
+    up to the next closing one.
+    """
+    if not any(opener in text for opener in _STRIP_OPENERS):
+        return _SPACE_BEFORE_MARK_PATTERN.sub(r'\1', text)
+
+    closers = [match.start() for match in _STRIP_CLOSERS_PATTERN.finditer(text)]
+    newlines = [match.start() for match in _NEWLINE_PATTERN.finditer(text)] if '\n' in text else []
+    candidates = sorted(
+        {match.start() for match in _SPACE_BEFORE_MARK_PATTERN.finditer(text)}
+        | {match.end() for match in _STRIP_OPENERS_PATTERN.finditer(text)}
+    )
+
+    pieces = []
+    last = 0
+    no_empty_at = -1  # re.sub never matches empty twice at the same position
+    i = 0
+    while i < len(candidates):
+        pos = candidates[i]
+        if pos < last:
+            i += 1
+            continue
+        if pos + 1 < len(text) and text[pos].isspace() and text[pos + 1] in '?,.!':
+            end = pos + 2
+        elif text[pos - 1] in _STRIP_OPENERS:
+            c = bisect_left(closers, pos + 1 if pos == no_empty_at else pos)
+            n = bisect_left(newlines, pos)
+            if c == len(closers) or (n < len(newlines) and newlines[n] < closers[c]):
+                i += 1
+                continue
+            end = closers[c]
+        else:
+            i += 1
+            continue
+
+        pieces.append(text[last:pos])
+        pieces.append(text[pos:end].strip())
+        last = end
+        if end == pos:
+            no_empty_at = pos
+        else:
+            i += 1
+
+    if not pieces:
+        return text
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+_EMOJI_PATTERN = re.compile(r"[\U0001F600-\U0001F64F]")
+
+_POSTFIX_SPECIAL_LIST = [
+    "ای", "ایم", "اید", "اند", "اش", "ام", "ات", "تان", "شان", "مان", "مون", "تون", "شون"
+]
+_POSTFIX_SUFFIX_PATTERN = re.compile(
+    r'\s+(' + '|'.join(_POSTFIX_SPECIAL_LIST) + r')(?=\s|[!؟،؛()\[\]]|$)', re.MULTILINE
+)
+_POSTFIX_SUFFIX_RANKS = {postfix: rank for rank, postfix in enumerate(_POSTFIX_SPECIAL_LIST)}
+
+
+def _join_suffix_tokens(text: str, pattern, ranks) -> str:
+    """
+    Replace the whitespace before stand-alone suffix tokens with ZWNJ in one scan.
+
+    The old chain ran one re.sub per suffix in list order, so a suffix listed earlier
+    could consume the whitespace the previous token needed as its delimiter, or eat
+    the space added after it. Those cases are resolved right to left over the matches.
+    """
+    matches = list(pattern.finditer(text))
+    if not matches:
+        return text
+
+    joined = [True] * len(matches)
+    keep_space = [True] * len(matches)
+    for i in range(len(matches) - 2, -1, -1):
+        current, following = matches[i], matches[i + 1]
+        if following.start() != current.end() or not joined[i + 1]:
+            continue
+        current_rank, following_rank = ranks[current.group(1)], ranks[following.group(1)]
+        if following_rank < current_rank:
+            joined[i] = False
+        elif following_rank > current_rank:
+            keep_space[i] = False
+
+    pieces = []
+    last = 0
+    for match, join, space in zip(matches, joined, keep_space):
+        if not join:
+            continue
+        pieces.append(text[last:match.start()])
+        pieces.append(ZWNJ + match.group(1) + (' ' if space else ''))
+        last = match.end()
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
+
+_ABBREVIATION_PATTERNS = _compile_patterns([
+    (r'\(ص\)', ' صلی‌الله‌علیه‌وآله '),
+    (r'\(ع\)', ' علیه‌السلام '),
+    (r'\(س\)', ' سلام‌الله‌علیها '),
+    (r'\(ره\)', ' رحمت‌الله‌علیه '),
+    (r'\(رض\)', ' رضی‌الله‌عنه '),
+    (r'\(عج\)', ' عجل‌الله‌تعالی‌فرجه '),
+    (r'\bه\.\s*ق\.?', ' هجری قمری '),
+    (r'\bه\.\s*ش\.?', ' هجری شمسی '),
+    (r'\bق\.\s*م\.?', ' قبل از میلاد '),
+    (r'\bر\.\s*ک\.?', ' رجوع کنید به '),
+    (r'\bص\.', ' صفحه '),
+    (r'\bج\.', ' جلد '),
+], re.MULTILINE)
+
+
+_BRACKET_CHARS = frozenset('()[]{}«»')
+_HTML_TRIGGER_CHARS = frozenset('<@hw')  # tags, emails, http... and www.
+_ABBREVIATION_TRIGGER_CHARS = frozenset('(.')
+_EMOJI_FIRST, _EMOJI_LAST = '\U0001F600', '\U0001F64F'
+
+# Stages that only change a sentence containing their trigger characters.
+# No built-in stage (nor the translation table) introduces these characters, so the
+# prescan of the raw input decides for the whole pipeline, up to the first custom stage.
+_PRESCAN_STAGES = frozenset([
+    'remove_html_tags', 'convert_dates_to_words', 'convert_numbers_to_words', 'separate_merged_numbers',
+    'remove_emoji', 'convert_abbreviations_to_text', 'remove_unbalanced_brackets',
+])
+
+
+def _prescan(text: str) -> set:
+    """Return the names of the prescan stages that can fire on text."""
+    chars = set(text)
+    firing = set()
+    if not chars.isdisjoint(_HTML_TRIGGER_CHARS):
+        firing.add('remove_html_tags')
+    if any(char.isdecimal() for char in chars):  # same digits as \d
+        firing.add('convert_numbers_to_words')
+        if '/' in chars:
+            firing.add('convert_dates_to_words')
+    if ZWNJ in chars:
+        firing.add('separate_merged_numbers')
+    if any(_EMOJI_FIRST <= char <= _EMOJI_LAST for char in chars):
+        firing.add('remove_emoji')
+    if not chars.isdisjoint(_ABBREVIATION_TRIGGER_CHARS):
+        firing.add('convert_abbreviations_to_text')
+    if not chars.isdisjoint(_BRACKET_CHARS):
+        firing.add('remove_unbalanced_brackets')
+    return firing
+
+
+# Built-in stages taking an optional counts argument; profiling passes it to count each rule's substitutions
+_RULE_COUNTING_STAGES = frozenset([
+    'remove_html_tags', 'join_mi_nemi_with_zwnj', 'convert_space_he_je', 'join_bi_with_zwnj',
+    'clean_punctuations', 'convert_abbreviations_to_text',
+])
+
+
+class NormalizerProfile:
+    """
+    Per-stage counters collected by PersianNormalizer(profile=True).
+
+    For every stage: calls, sentences it changed, wall time and characters in/out.
+    For the built-in stages made of rules: substitutions made by each regex rule, and sentences
+    changed by each translation or scanner step.
+    Profiles from several processes can be combined with merge().
+    """
+
+    STAGE_FIELDS = ('calls', 'changed', 'seconds', 'chars_in', 'chars_out')
+
+    def __init__(self) -> None:
+        self.stages = {}
+        self.rules = {}
+
+    def record(self, name: str, seconds: float, text_in: str, text_out: str) -> None:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = dict.fromkeys(self.STAGE_FIELDS, 0)
+        stage['calls'] += 1
+        stage['changed'] += text_in != text_out
+        stage['seconds'] += seconds
+        stage['chars_in'] += len(text_in)
+        stage['chars_out'] += len(text_out)
+
+    def record_rule(self, stage: str, rule: str, substitutions: int) -> None:
+        key = (stage, rule)
+        self.rules[key] = self.rules.get(key, 0) + substitutions
+
+    def merge(self, other: 'NormalizerProfile') -> None:
+        for name, counters in other.stages.items():
+            stage = self.stages.setdefault(name, dict.fromkeys(self.STAGE_FIELDS, 0))
+            for field, value in counters.items():
+                stage[field] += value
+        for key, substitutions in other.rules.items():
+            self.rules[key] = self.rules.get(key, 0) + substitutions
+
+    def to_dict(self) -> dict:
+        return {
+            'stages': self.stages,
+            'rules': [{'stage': stage, 'rule': rule, 'substitutions': n} for (stage, rule), n in self.rules.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'NormalizerProfile':
+        profile = cls()
+        profile.stages = {name: dict(counters) for name, counters in data['stages'].items()}
+        profile.rules = {(row['stage'], row['rule']): row['substitutions'] for row in data['rules']}
+        return profile
+
+    def to_json(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def to_csv(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('stage', 'rule') + self.STAGE_FIELDS + ('substitutions',))
+            for name, counters in self.stages.items():
+                writer.writerow((name, '') + tuple(counters[field] for field in self.STAGE_FIELDS) + ('',))
+            for (name, rule), substitutions in self.rules.items():
+                writer.writerow((name, rule) + ('',) * len(self.STAGE_FIELDS) + (substitutions,))
+
+
+class NormalizationCache:
+    """
+    On-disk cache of normalized sentences, stored in sqlite.
+
+    Keys are a hash of (rule-set version, normalizer flags, custom stage versions, input text),
+    so changing the rules, the flags or a custom stage never serves a stale result.
+    When the stored values grow past max_bytes the oldest entries are evicted: first in,
+    first out by insertion, reads do not refresh an entry. Several processes can share one file.
+    """
+
+    def __init__(self, path: str, namespace: str = '', max_bytes: int = 1 << 30, commit_every: int = 1000) -> None:
+        self.path = path
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connection = None
+        self._inherited_connection = None
+        self._pid = None
+        self._pending = 0
+        self._size = 0
+
+    def __getstate__(self):
+        # sqlite connections cannot be pickled; the copy reconnects on first use
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_inherited_connection'] = None
+        state['_pending'] = 0
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # a forked process must not use its parent's connection, it opens its own
+        if self._connection is None or self._pid != os.getpid():
+            # the inherited one is kept referenced: closing it here could drop this process's file locks
+            self._inherited_connection = self._connection
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._pid = os.getpid()
+            self._pending = 0
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS normalized (key BLOB PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._size = self._stored_size()
+        return self._connection
+
+    def _stored_size(self) -> int:
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM normalized").fetchone()[0]
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b((self.namespace + text).encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key: bytes):
+        row = self.connection.execute("SELECT value FROM normalized WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: bytes, value: str) -> None:
+        size = len(value.encode('utf-8')) + len(key)
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO normalized (key, value, size) VALUES (?, ?, ?)", (key, value, size)
+        )
+        self._size += size * cursor.rowcount
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        if self._connection is None or self._pid != os.getpid():
+            return
+        self._connection.commit()
+        self._pending = 0
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        # other processes may have written too, so start from the real size
+        self._size = self._stored_size()
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._connection.execute(
+                "SELECT rowid, size FROM normalized ORDER BY rowid LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            freed = 0
+            last_rowid = rows[-1][0]
+            for rowid, size in rows:
+                freed += size
+                if self._size - freed <= target:
+                    last_rowid = rowid
+                    break
+            deleted = self._connection.execute("DELETE FROM normalized WHERE rowid <= ?", (last_rowid,)).rowcount
+            self.evictions += deleted
+            self._size = self._stored_size()
+        self._connection.commit()
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self.commit()
+            self._connection.close()
+        self._connection = None
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.evictions = 0
+
+    def counters(self) -> dict:
+        """Hits, misses and evictions so far, without reading the stored size (cheap, see merge_stats)."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def merge_stats(self, stats: dict) -> None:
+        """Add the counters() of a copy of this cache used by another process, e.g. a pool worker."""
+        self.hits += stats['hits']
+        self.misses += stats['misses']
+        self.evictions += stats['evictions']
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        # pool workers may have written too, so report the real size
+        self._size = self._stored_size()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'stored_bytes': self._size,
+        }
+
+
+class _VerbMatcher:
+    """
+    Prefix trie over the verb dictionary.
+    Finds می/نمی followed by a known verb in a single scan of the text.
+    """
+
+    def __init__(self, verbs: List[str]) -> None:
+        self.root = {}
+        for index, verb in enumerate(verbs):
+            node = self.root
+            for char in verb:
+                node = node.setdefault(char, {})
+            # keep the first dictionary position, the same verb the old alternation regex picked
+            node.setdefault(_VERB_END, index)
+
+    def match(self, text: str, start: int) -> int:
+        """Return the end offset of the verb that text[start:] begins with, or -1."""
+        node = self.root
+        best_index = best_end = -1
+        pos = start
+        while True:
+            index = node.get(_VERB_END)
+            if index is not None and (best_index < 0 or index < best_index):
+                best_index, best_end = index, pos
+            if pos >= len(text):
+                break
+            node = node.get(text[pos])
+            if node is None:
+                break
+            pos += 1
+        return best_end
+
+    def separate(self, text: str) -> str:
+        pieces = []
+        last = 0
+        consumed = 0
+        for match in _MI_NEMI_PREFIX_PATTERN.finditer(text):
+            if match.start() < consumed:
+                continue
+            end = self.match(text, match.end())
+            if end < 0:
+                continue
+            pieces.append(text[last:match.end()])
+            pieces.append(ZWNJ)
+            last = match.end()
+            consumed = end
+        if not pieces:
+            return text
+        pieces.append(text[last:])
+        return ''.join(pieces)
+
+
+# (verbs, matcher) loaded once per process and shared by every normalizer in it.
+# Forked pool workers inherit it from the parent.
+_shared_verbs = None
+
+
+def _read_verbs_dict() -> List:
+    verbs_dict = []
+    try:
+        with resources.files('pernorm.data').joinpath('verbs.dict').open('r', encoding='utf-8') as f:
+            for line in f:
+                verb = line.strip()
+                if verb:
+                    verbs_dict.append(verb)
+    except Exception as e:
+        print(f"Error loading verbs: {e}")
+    return verbs_dict
+
+
+def get_shared_verbs() -> tuple:
+    """
+    Return the process wide (verbs, matcher) pair, loading it on first use.
+    Each process holds one copy; forked workers share the parent's.
+    """
+    global _shared_verbs
+    if _shared_verbs is None:
+        verbs = tuple(_read_verbs_dict())
+        _shared_verbs = (verbs, _VerbMatcher(verbs))
+    return _shared_verbs
+
+
+def register_stage(name: str, stage: Callable[['PersianNormalizer', str], str], version: str = None) -> None:
+    """
+    Make a custom stage available to PersianNormalizer(stages=[...]).
+
+    Args:
+        name: stage name, must not be one of DEFAULT_STAGES
+        stage: called as stage(normalizer, text) and returns the new text.
+            Pool workers (normalize_batch, normalize_file) see it only when it is
+            registered at import time or inherited by fork.
+        version: identifies what the stage does (e.g. its model checkpoint) and is part of the
+            NormalizationCache keys; change it whenever the output changes. Normalizers running
+            an unversioned custom stage do not use the cache.
+    """
+    if name in DEFAULT_STAGES:
+        raise ValueError(f"{name} is a built-in stage")
+    _STAGE_REGISTRY[name] = stage
+    _STAGE_VERSIONS[name] = version
+    _compile_plan.cache_clear()
+
+
+def available_stages() -> tuple:
+    """Names of the built-in and registered stages."""
+    return DEFAULT_STAGES + tuple(_STAGE_REGISTRY)
+
+
+@lru_cache(maxsize=None)
+def _compile_plan(cls: type, stages: tuple) -> tuple:
+    # (name, stage) pairs for one stage list, shared by every normalizer configured with it.
+    # Built-in stages come from the class, so subclasses can override them.
+    plan = []
+    for name in stages:
+        if name in DEFAULT_STAGES:
+            plan.append((name, getattr(cls, name)))
+        elif name in _STAGE_REGISTRY:
+            plan.append((name, _STAGE_REGISTRY[name]))
+        else:
+            raise ValueError(f"Unknown normalizer stage: {name}")
+    return tuple(plan)
+
+
+def hamnevise_stage(model, tokenizer) -> Callable:
+    """
+    Stage adapter for a hamnevise HamneviseModel (homograph disambiguation).
+    Sentences without any word the model knows are passed through untouched.
+
+    Example:
+        hmodel, tokenizer = HamneviseModel.load()
+        register_stage('hamnevise', hamnevise_stage(hmodel, tokenizer), version='hamnevise-v1')
+        normalizer = PersianNormalizer(stages=DEFAULT_STAGES + ('hamnevise',))
+    """
+    words = frozenset(model.word2idx)
+
+    def hamnevise(normalizer, text):
+        if words.isdisjoint(text.split()):
+            return text
+        disambiguated, _ = model.disambiguate(text, tokenizer=tokenizer)
+        return disambiguated
+    return hamnevise
+
+
+def zirneshane_stage(model) -> Callable:
+    """Stage adapter for a zirneshane HybridZirneshanModel (adds the kasre-ezafe marks)."""
+    def zirneshane(normalizer, text):
+        return model.predict(text)
+    return zirneshane
+
+
 class PersianNormalizer:
     def __init__(
         self,
@@ -26,7 +817,10 @@ class PersianNormalizer:
         convert_abbreviations: bool = True,
         remove_unbalanced_brackets: bool = True,
         separate_merged_numbers: bool = True,
-        
+        stages: Sequence[str] = None,
+        cache_path: str = None,
+        cache_max_bytes: int = 1 << 30,
+        profile: bool = False,
     ) -> None:
         self._correct_spacing = correct_spacing
         self._persian_numbers = persian_numbers
@@ -43,70 +837,180 @@ class PersianNormalizer:
         self._convert_abbreviations = convert_abbreviations
         self._remove_unbalanced_brackets = remove_unbalanced_brackets
         self._separate_merged_numbers = separate_merged_numbers
+        # explicit stage order, overriding the stage flags above
+        self._stages = None if stages is None else tuple(stages)
 
-        self.translation_src = "ؠػػؽؾؿكيٮٯٷٸٹٺٻټٽٿڀځٵٶٷٸٹٺٻټٽٿڀځڂڅڇڈډڊڋڌڍڎڏڐڑڒړڔڕږڗڙښڛڜڝڞڟڠڡڢڣڤڥڦڧڨڪګڬڭڮڰڱڲڳڴڵڶڷڸڹںڻڼڽھڿہۂۃۄۅۆۇۈۉۊۋۏۍێېۑےۓەۮۯۺۻۼۿݐݑݒݓݔݕݖݗݘݙݚݛݜݝݞݟݠݡݢݣݤݥݦݧݨݩݪݫݬݭݮݯݰݱݲݳݴݵݶݷݸݹݺݻݼݽݾݿࢠࢡࢢࢣࢤࢥࢦࢧࢨࢩࢪࢫࢮࢯࢰࢱࢬࢲࢳࢴࢶࢷࢸࢹࢺࢻࢼࢽﭐﭑﭒﭓﭔﭕﭖﭗﭘﭙﭚﭛﭜﭝﭞﭟﭠﭡﭢﭣﭤﭥﭦﭧﭨﭩﭮﭯﭰﭱﭲﭳﭴﭵﭶﭷﭸﭹﭺﭻﭼﭽﭾﭿﮀﮁﮂﮃﮄﮅﮆﮇﮈﮉﮊﮋﮌﮍﮎﮏﮐﮑﮒﮓﮔﮕﮖﮗﮘﮙﮚﮛﮜﮝﮞﮟﮠﮡﮢﮣﮤﮥﮦﮧﮨﮩﮪﮫﮬﮭﮮﮯﮰﮱﺀﺁﺃﺄﺅﺆﺇﺈﺉﺊﺋﺌﺍﺎﺏﺐﺑﺒﺕﺖﺗﺘﺙﺚﺛﺜﺝﺞﺟﺠﺡﺢﺣﺤﺥﺦﺧﺨﺩﺪﺫﺬﺭﺮﺯﺰﺱﺲﺳﺴﺵﺶﺷﺸﺹﺺﺻﺼﺽﺾﺿﻀﻁﻂﻃﻄﻅﻆﻇﻈﻉﻊﻋﻌﻍﻎﻏﻐﻑﻒﻓﻔﻕﻖﻗﻘﻙﻚﻛﻜﻝﻞﻟﻠﻡﻢﻣﻤﻥﻦﻧﻨﻩﻪﻫﻬﻭﻮﯽﻯﻰﻱﻲﯿﻳﯾﻴىكي“” "
-        self.translation_dst = ('یککیییکیبقویتتبتتتبحاوویتتبتتتبحححچدددددددددررررررررسسسصصطعففففففققکککککگگگگگللللنننننهچهههوووووووووییییییهدرشضغهبببببببححددرسعععففکککممنننلررسححسرحاایییووییحسسکببجطفقلمییرودصگویزعکبپتریفقنااببببپپپپببببتتتتتتتتتتتتففففححححححححچچچچچچچچددددددددژژررککککگگگگگگگگگگگگننننننههههههههههییییءاااووااییییااببببتتتتثثثثججججححححخخخخددذذررززسسسسششششصصصصضضضضططططظظظظععععغغغغففففققققککککللللممممننننههههووییییییییییکی"" ')
+        self.translation_src = _TRANSLATION_SRC
+        self.translation_dst = _TRANSLATION_DST
+        self._translations = _TRANSLATIONS
+
+        self.verbs, self._verb_matcher = get_shared_verbs()
+
+        self._plan = self._build_plan()
+
+        # optional on-disk cache of normalized sentences
+        self.cache = None
+        if cache_path is not None:
+            namespace = f"{RULES_VERSION}|{json.dumps(self.options, sort_keys=True)}|"
+            custom = {name: _STAGE_VERSIONS[name] for name in self.stages if name in _STAGE_REGISTRY}
+            unversioned = [name for name, version in custom.items() if version is None]
+            if unversioned:
+                print(f"Normalization cache disabled: custom stages {unversioned} have no version (see register_stage)")
+            else:
+                if custom:
+                    namespace += f"{json.dumps(custom, sort_keys=True)}|"
+                self.cache = NormalizationCache(cache_path, namespace, cache_max_bytes)
+
+        # opt-in per-stage timing, see NormalizerProfile
+        self.profile = NormalizerProfile() if profile else None
+
+        # how often the prescan let a stage be skipped, see skip_stats()
+        self._skipped_stages = Counter()
+        self._normalized_count = 0
+
+    def _build_plan(self) -> tuple:
+        # Resolve the stages once; normalize() just walks this tuple for every sentence
+        return _compile_plan(type(self), self.stages)
+
+    @property
+    def stages(self) -> tuple:
+        """Names of the stages normalize() runs, in order."""
+        if self._stages is not None:
+            return self._stages
+        return tuple(name for name, flag in _DEFAULT_STAGE_FLAGS if getattr(self, f'_{flag}'))
 
-        self.verbs = self.load_verbs()
-        
     def normalize(self, text: str) -> str:
+        run = None if self.profile is None else self._run_profiled
+        if self.cache is None:
+            return self._normalize(text, run)
+
+        key = self.cache.key(text)
+        normalized = self.cache.get(key)
+        if normalized is None:
+            normalized = self._normalize(text, run)
+            self.cache.put(key, normalized)
+        return normalized
+
+    def _normalize(self, text: str, run: Callable = None) -> str:
+        # run(name, stage, text), if given, runs every step instead of stage(self, text) (see _run_profiled)
+        # find the stages that cannot fire on this sentence (no digits, brackets, emoji, ...)
+        firing = _prescan(text)
+        skipped = self._skipped_stages
+        self._normalized_count += 1
+
         # remove HTML tags and URLs
-        text = self.remove_html_tags(text)
+        if 'remove_html_tags' in firing:
+            remove_html_tags = type(self).remove_html_tags
+            text = remove_html_tags(self, text) if run is None else run('remove_html_tags', remove_html_tags, text)
+        else:
+            skipped['remove_html_tags'] += 1
 
-        # remove multiple spaces
-        text = re.sub(r"\s+", " ", text).strip()
-        
-        translations = str.maketrans(self.translation_src, self.translation_dst)
-        text = text.translate(translations)
+        # remove multiple spaces, then the character translations
+        if run is None:
+            text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+            text = text.translate(self._translations)
+        else:
+            text = run('collapse_whitespace', lambda self, t: _WHITESPACE_PATTERN.sub(" ", t).strip(), text)
+            text = run('translate', lambda self, t: t.translate(self._translations), text)
 
-        if self._persian_numbers:
-            text = self.persian_number(text)
+        return self._run_plan(text, self._plan, firing, run, skipped)
 
-        if self._convert_dates_to_words:
-            text = self.convert_dates_to_words(text)
-        
-        # Convert numbers to words BEFORE cleaning punctuations
-        # This ensures negative numbers are handled before hyphen processing
-        if self._convert_numbers_to_words:
-            text = self.convert_numbers_to_words(text)
-        
-        if self._clean_punctuations:
-            text = self.clean_punctuations(text)
+    def _run_plan(self, text: str, plan: tuple, firing: set, run: Callable = None, skipped: Counter = None) -> str:
+        # Run the (name, stage) pairs of plan, skipping the prescan stages not in firing.
+        # No built-in step adds prescan trigger characters, so firing only changes after a custom stage.
+        for name, stage in plan:
+            if name in _PRESCAN_STAGES and name not in firing:
+                if skipped is not None:
+                    skipped[name] += 1
+                continue
+            text = stage(self, text) if run is None else run(name, stage, text)
+            if name in _STAGE_REGISTRY:
+                # a custom stage may add characters the prescan looks for
+                firing = _prescan(text)
+        return text
 
-        if self._separate_merged_numbers:
-            text = self.separate_merged_numbers(text)
-            
-        if self._separate_mi_nemi:
-            text = self.separate_mi_nemi(text)
+    def _run_profiled(self, name: str, stage, text: str) -> str:
+        start = time.perf_counter()
+        counts = None
+        if name in _RULE_COUNTING_STAGES and stage is getattr(PersianNormalizer, name):
+            # the built-in rules; an override only gets the stage totals
+            counts = Counter()
+            result = stage(self, text, counts)
+        else:
+            result = stage(self, text)
+        self.profile.record(name, time.perf_counter() - start, text, result)
+        if counts:
+            for rule, substitutions in counts.items():
+                self.profile.record_rule(name, rule, substitutions)
+        return result
 
-        if self._add_zwnj_mi_nemi:
-            text = self.join_mi_nemi_with_zwnj(text)
+    def normalize_batch(self, texts: Iterable[str], workers: int = 1, chunksize: int = 1000) -> Iterator[str]:
+        """
+        Normalize many texts, optionally over a pool of worker processes.
 
-        if self._convert_space_he_je:
-            text = self.convert_space_he_je(text)
+        Args:
+            texts: iterable of strings, consumed lazily (a file object works)
+            workers: number of processes; 1 normalizes in this process
+            chunksize: number of texts sent to a worker per task
 
-        if self._join_ha_with_zwnj:
-            text = self.join_ha_with_zwnj(text)
+        Returns:
+            iterator over the normalized texts, in input order.
+            At most 2 * workers chunks are in flight, so memory stays bounded on large inputs.
+        """
+        if workers <= 1:
+            for text in texts:
+                yield self.normalize(text)
+            if self.cache is not None:
+                self.cache.commit()
+            return
 
-        if self._join_postfix_specials:
-            text = self.join_postfix_specials(text)
+        texts = iter(texts)
+        if self.cache is not None:
+            self.cache.commit()  # so the workers see this process's entries and the file is not locked
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(type(self), self.options, self.cache, self.profile is not None)) as pool:
+            pending = deque()
+            while True:
+                chunk = list(islice(texts, chunksize))
+                if chunk:
+                    pending.append(pool.submit(_normalize_chunk, chunk))
+                if pending and (not chunk or len(pending) >= 2 * workers):
+                    normalized, profile, skipped, cache_stats = pending.popleft().result()
+                    if profile is not None:
+                        self.profile.merge(NormalizerProfile.from_dict(profile))
+                    self.merge_skip_stats(skipped)
+                    if cache_stats is not None:
+                        self.cache.merge_stats(cache_stats)
+                    yield from normalized
+                elif not chunk:
+                    break
 
-        if self._join_bi_with_zwnj:
-            text = self.join_bi_with_zwnj(text)
+    @property
+    def options(self) -> dict:
+        """The constructor flags of this normalizer, plus the stage list when one was given."""
+        options = {name: getattr(self, f'_{name}') for name in _OPTION_NAMES}
+        if self._stages is not None:
+            options['stages'] = list(self._stages)
+        return options
 
-        if self._remove_emoji:
-            text = self.remove_emoji(text)
+    def skip_stats(self) -> dict:
+        """
+        Number of sentences normalized and how many times each stage was skipped by the prescan.
+        """
+        return {
+            'sentences': self._normalized_count,
+            'skipped_total': sum(self._skipped_stages.values()),
+            'skipped': dict(self._skipped_stages),
+        }
 
-        # if self._separate_he_eed:
-        #     text = self.separate_he_eed(text)
+    def reset_skip_stats(self) -> None:
+        self._skipped_stages.clear()
+        self._normalized_count = 0
 
-        if self._convert_abbreviations:
-            text = self.convert_abbreviations_to_text(text)
-        
-        if self._remove_unbalanced_brackets:
-            text = self.remove_unbalanced_brackets(text)
-            
-        return text
+    def merge_skip_stats(self, stats: dict) -> None:
+        """Add the skip_stats() of another normalizer, e.g. of a pool worker."""
+        self._normalized_count += stats['sentences']
+        self._skipped_stages.update(stats['skipped'])
 
     # def load_verbs(self, file_path=f'{currentpath}/data/verbs.dict') -> List:
     #     verbs_dict = []
@@ -117,209 +1021,120 @@ class PersianNormalizer:
     #     return verbs_dict
 
     def load_verbs(self) -> List:
-        verbs_dict = []
-        try:
-            with resources.files('pernorm.data').joinpath('verbs.dict').open('r', encoding='utf-8') as f:
-                for line in f:
-                    verb = line.strip()
-                    if verb:
-                        verbs_dict.append(verb)
-        except Exception as e:
-            print(f"Error loading verbs: {e}")
-        return verbs_dict
+        return _read_verbs_dict()
+
+    def __getstate__(self):
+        # the verbs and compiled plans are shared per process, so pickles (e.g. for pool workers) leave them out
+        state = self.__dict__.copy()
+        del state['verbs'], state['_verb_matcher'], state['_plan']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.verbs, self._verb_matcher = get_shared_verbs()
+        self._plan = self._build_plan()
     
     def persian_number(self, text: str) -> str:
-        number_translation_src = "0123456789%٠١٢٣٤٥٦٧٨٩"
-        number_translation_dst = "۰۱۲۳۴۵۶۷۸۹٪۰۱۲۳۴۵۶۷۸۹"
-        translations = str.maketrans(number_translation_src, number_translation_dst)
-        
-        return text.translate(translations)
+        return text.translate(_PERSIAN_NUMBER_TRANSLATIONS)
 
     def separate_mi_nemi(self, text: str) -> str:
-        mi_sentence_level_verb_patterns = r'(?<!\S)می(' + '|'.join(re.escape(verb) for verb in self.verbs) + r')'
-        nemi_sentence_level_verb_patterns = r'(?<!\S)نمی(' + '|'.join(re.escape(verb) for verb in self.verbs) + r')'
-
         # separate می and نمی from verbs, for example میرویم with می‌رویم
-        text = re.sub(nemi_sentence_level_verb_patterns, rf'نمی{ZWNJ}\1', text)
-        text = re.sub(mi_sentence_level_verb_patterns, rf'می{ZWNJ}\1', text)
+        if 'می' not in text:
+            return text
+        return self._verb_matcher.separate(text)
 
-        return text
-
-    def join_mi_nemi_with_zwnj(self, text:str) -> str:
+    def join_mi_nemi_with_zwnj(self, text:str, counts: Counter = None) -> str:
         # Join mi and nemi  with ZWNJ instad of space
-        mi_nemi_sentence_level_patterns = [
-            (r"^می\s+", f"می{ZWNJ}"),
-            (r"\s+می\s+", f" می{ZWNJ}"),
-            (r"^نمی\s+", f"نمی{ZWNJ}"),
-            (r"\s+نمی\s+", f" نمی{ZWNJ}"),
-        ]
         # concatenate می and نمی to verbs, for example می رویم with می‌رویم
-        for pattern in mi_nemi_sentence_level_patterns:
-            text = re.sub(pattern[0], pattern[1], text)
-        return text
-
-    def convert_space_he_je(self, text: str) -> str:
-        he_je_sentence_level_patterns = [
-            (r"ه\s+ی\s+", "ۀ "), # replacement of ی with ۀ
-            (rf"ه{ZWNJ}ی\s+", "ۀ "), # replacement of ی with ۀ
-            
-        ]
+        return _apply_patterns(text, _MI_NEMI_PATTERNS, counts)
 
+    def convert_space_he_je(self, text: str, counts: Counter = None) -> str:
         # replace words کلمه ی with کلمۀ
-        for pattern in he_je_sentence_level_patterns:
-            text = re.sub(pattern[0], pattern[1], text, flags=re.MULTILINE)
-        return text
+        return _apply_patterns(text, _HE_JE_PATTERNS, counts)
 
     def join_ha_with_zwnj(self, text: str) -> str:
-        ha_special_list = [
-          "هایمان", "هایم", "هایت", "هایش", "هایتان", "هایشان", "هام", "هات", "هاتان",
-          "هامون", "هامان", "هاش", "هاتون", "هاشان", "هاشون", "هایی", "های", "هاس", "ها", "هاست", "هاشو"
-        ]
-  
-        ha_patterns_replace_space_with_zwnj = [(rf'\s+{ha}(?=(?:\s|[\.!\?؟،,؛()\[\]]|$))', f'{ZWNJ}{ha} ') for ha in ha_special_list]
-        ha_patterns_add_zwnj_between_ha_ha = [(rf'ه{ha}(\s?[!؟،؛()\[\]]?)', f'ه{ZWNJ}{ha} ') for ha in ha_special_list]
-        for pattern in ha_patterns_replace_space_with_zwnj:
-            text = re.sub(pattern[0], pattern[1], text, flags=re.MULTILINE)
-
-        for pattern in ha_patterns_add_zwnj_between_ha_ha:
-            text = re.sub(pattern[0], pattern[1], text, flags=re.MULTILINE)
-        return text
+        if 'ها' not in text:
+            return text
+        text = _join_suffix_tokens(text, _HA_SUFFIX_PATTERN, _HA_SUFFIX_RANKS)
+        return _HA_AFTER_HE_PATTERN.sub(rf'ه{ZWNJ}\1 ', text)
 
     def convert_dates_to_words(self, text: str) -> str:
-        date_pattern = r'\d{2,4}/\d{1,2}/\d{1,2}'  # Matches dates (e.g., 1402/11/29)
         # Replace dates first (to avoid breaking numbers inside them)
-        dates = re.findall(date_pattern, text)
-        for date in dates:
-            parts = date.split('/')
-            day = ordinal_words(parts[2])
-            month = words(parts[1])
-            year = words(parts[0])
-            date_words = f"{day}ِ {month}ِ {year}"            
-            text = text.replace(date, date_words, 1)
-        return text
+        return _DATE_PATTERN.sub(_replace_date, text)
 
     def convert_numbers_to_words(self, text: str) -> str:
-        # Pattern that matches optional negative sign followed by number
-        # The negative lookbehind (?<![آ-ی]) ensures - is not preceded by Persian characters
-        # This prevents matching - in ایرانی-آمریکایی
-        number_pattern = r'(?<![آ-ی])-?\d*\.?\d+'  # Matches integers, floats, and negative numbers
-        numbers = re.findall(number_pattern, text)
-        for num in numbers:
-            if num.startswith('-'):
-                # Handle negative numbers
-                num_word = f"منفی " + words(num[1:])  # Remove - and add منفی prefix
-            else:
-                num_word = words(num)
-            num_word = num_word # num2fawords returns words separated by spaces, which is what we want now
-            text = text.replace(num, num_word, 1)
-        return text
+        return _NUMBER_PATTERN.sub(_replace_number, text)
+
+    def number_cache_info(self) -> dict:
+        """
+        Hit/miss counters of the number and date verbalization caches.
+        The caches are shared by every normalizer in the process.
+        """
+        hits = misses = size = 0
+        for cached in (_date_to_words, _number_to_words):
+            info = cached.cache_info()
+            hits += info.hits
+            misses += info.misses
+            size += info.currsize
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'size': size,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
 
     def separate_merged_numbers(self, text: str) -> str:
         # separate numbers that were previously merged with ZWNJ
         # This is needed because the user previously used replace(' ', ZWNJ) on number words
-        ones = ["صفر", "یک", "دو", "سه", "چهار", "پنج", "شش", "هفت", "هشت", "نه"]
-        teens = ["ده", "یازده", "دوازده", "سیزده", "چهارده", "پانزده", "شانزده", "هفده", "هجده", "نوزده"]
-        tens = ["بیست", "سی", "چهل", "پنجاه", "شصت", "هفتاد", "هشتاد", "نود"]
-        hundreds = ["صد", "یکصد", "دویست", "سیصد", "چهارصد", "پانصد", "ششصد", "هفتصد", "هشتصد", "نهصد"]
-        scales = ["هزار", "میلیون", "میلیارد", "بیلیون", "تریلیون", "کوادریلیون"]
-        others = ["و", "منفی", "ممیز"]
-        
-        all_number_words = set(ones + teens + tens + hundreds + scales + others)
-        
-        # Build regex pattern: (number_word)(ZWNJ)(number_word)
-        # Using capturing groups instead of lookbehind
-        words_pattern = "|".join(re.escape(w) for w in all_number_words)
-        
-        pattern = rf'({words_pattern}){ZWNJ}({words_pattern})'
-        
-        # We need to run this in a loop to handle overlapping matches e.g. "one-and-two"
-        # "one-and" matches, but "and-two" starts inside the match.
-        # Alternatively, we can use 2 passes or just a loop until no change.
-        
-        prev_text = None
-        while prev_text != text:
-            prev_text = text
-            text = re.sub(pattern, r'\1 \2', text)
-            
-        return text
+        # e.g. "یک‌و‌دو" -> "یک و دو", in a single pass (see _merged_numbers_pattern)
+        if ZWNJ not in text:
+            return text
+        return _MERGED_NUMBERS_PATTERN.sub(' ', text)
 
-    def join_bi_with_zwnj(self, text: str) -> str:
-        bi_sentence_level_patterns = [
-            (r"(^|\s+)بی\s+", f" بی{ZWNJ}"),
-        ]
-        for pattern in bi_sentence_level_patterns:
-            text = re.sub(pattern[0], pattern[1], text)
-        return text
+    def join_bi_with_zwnj(self, text: str, counts: Counter = None) -> str:
+        return _apply_patterns(text, _BI_PATTERNS, counts)
 
-    def clean_punctuations(self, text: str) -> str:
-        sentence_cleaner_list_of_patterns = [
-            (r",", "،"),
-            (r"‘", "،"),
-            (r"’", "،"),
-            (r"'", "،"),
-            (r";", "؛"),
-            (r"/", " یا "),
-            (r"#", " هشتگ "),
-            (r"=", " برابر است با "),
-            (r"[٪%]", " درصد "),
-            (r"،\s*", "، "),
-            (r"/", " یا "),
-            (r'[*\\]', r''), # remove « , », *, /, \
-            (r'\?', r'؟'), # replace ? with ؟
-            (r' +', ' '),  # Remove multiple space
-            (r'([:؛،])\n', r'\1'),
-            (r'\s([،؟.،؛:!](?:\s|$))', r'\1'),  # remove space before punctuations
-            (r'(?<=[،؟.،؛:!])(?=\S)', r' '),   # add space after punctuations
-            (r"\s?(\(.*?\))\s?", r" \1 "),  # Add space before and after ( and )
-            (r"\s?(\{.*?\})\s?", r" \1 "),  # Add space before and after { and }
-            (r"\s?(\[.*?])\s?", r" \1 "),  # Add space before and after [ and ]
-            (r"\s?(«.*?»)\s?", r" \1 "),  # Add space before and after « and »
-            (r"\s?(‹.*?›)\s?", r" \1 "),  # Add space before and after ‹ and ›            
-            (r"\s?(-.*?-)\s?", r" \1 "),  # Add space before and after - and -
-            (r"\s?(‒.*?‒)\s?", r" \1 "),  # Add space before and after ‒ and ‒ (En Dash)
-            (r'\s?(".*?")\s?', r' \1 '),  # Add space before and after " and "
-            (r'(\s([?,.!]))|(?<=[\[(\{])(.*?)(?=[)\]\}])', lambda x: x.group().strip()),   # Remove space after & before '(' and '[' and '{'
-            (r" {2,}", " "),  # remove extra spaces
-            (r"\n{3,}", "\n\n"),  # remove extra newlines
-            (r"\n+", "\n"),
-            (r"\u200c{2,}", "\u200c"),  # remove extra ZWNJs
-            (r"\u200c{1,} ", " "),  # remove unneded ZWNJs before space
-            (r" \u200c{1,}", " "),  # remove unneded ZWNJs after space
-            (r"\b\u200c*\B", ""),  # remove unneded ZWNJs at the beginning of words
-            (r"\B\u200c*\b", ""),  # remove unneded ZWNJs at the end of words
-            (r"[ـ\r]", ""),  # remove keshide, carriage returns
-            (r" ?\.\.\.", " …"),  # replace 3 dots
-            (r"(\d)([آابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی])", r"\1 \2"), # put space after number; e.g., به طول ۹متر -> به طول ۹ متر
-            (r"([آابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی])(\d)", r"\1 \2"), # put space after number; e.g., به طول۹ -> به طول ۹
-        ]
-
-        for pattern in sentence_cleaner_list_of_patterns:
-            text = re.sub(pattern[0], pattern[1], text)
+    def clean_punctuations(self, text: str, counts: Counter = None) -> str:
+        if not _PUNCTUATION_CHARS.isdisjoint(text):
+            text = _count_change(counts, 'punctuation translations', text, text.translate(_PUNCTUATION_TRANSLATIONS))
+        if '،' in text:
+            text = _sub(_COMMA_SPACING_PATTERN, "، ", text, counts)
+        if not _MARK_CHARS.isdisjoint(text):
+            text = _count_change(counts, 'mark translations', text, text.translate(_MARK_TRANSLATIONS))
+        text = _sub(_EXTRA_SPACES_PATTERN, ' ', text, counts)  # Remove multiple space
+        if '\n' in text:
+            text = _sub(_PUNCTUATION_NEWLINE_PATTERN, r'\1', text, counts)
+        if not _SPACE_BEFORE_PUNCTUATION_CHARS.isdisjoint(text):
+            text = _sub(_SPACE_BEFORE_PUNCTUATION_PATTERN, r'\1', text, counts)
+            text = _sub(_SPACE_AFTER_PUNCTUATION_PATTERN, ' ', text, counts)
+        for opener, closer, rule in _SPACED_PAIR_RULES:
+            text = _count_change(counts, rule, text, _space_around_pairs(text, opener, closer))
+        # Remove space after & before '(' and '[' and '{'
+        text = _count_change(counts, 'strip bracket contents', text, _strip_bracket_contents(text))
+        text = _sub(_EXTRA_SPACES_PATTERN, " ", text, counts)  # remove extra spaces
+        if '\n' in text:
+            text = _sub(_NEWLINES_PATTERN, "\n", text, counts)  # remove extra newlines
+        if ZWNJ in text:
+            text = _apply_patterns(text, _ZWNJ_PATTERNS, counts)
+        if 'ـ' in text or '\r' in text:
+            text = _sub(_KESHIDE_PATTERN, "", text, counts)
+        if '...' in text:
+            text = _sub(_THREE_DOTS_PATTERN, " …", text, counts)  # replace 3 dots
+        if _DIGIT_PATTERN.search(text):
+            text = _apply_patterns(text, _DIGIT_SPACING_PATTERNS, counts)
         return text
 
     def remove_emoji(self, text: str) -> str:
         # remove emojies
-        text = re.sub(r"[\U0001F600-\U0001F64F]", "", text)  # Remove emojis
-        return text
+        return _EMOJI_PATTERN.sub("", text)  # Remove emojis
 
     def join_postfix_specials(self, text: str) -> str:
-        postfix_special_list = [
-            "ای", "ایم", "اید", "اند", "اش", "ام", "ات", "تان", "شان", "مان", "مون", "تون", "شون"
-        ]
-        patterns = [(rf'\s+{postfix}(?=\s|[!؟،؛()\[\]]|$)', f'{ZWNJ}{postfix} ') for postfix in postfix_special_list]
-        for pattern in patterns:
-            text = re.sub(pattern[0], pattern[1], text, flags=re.MULTILINE)
-        return text
+        return _join_suffix_tokens(text, _POSTFIX_SUFFIX_PATTERN, _POSTFIX_SUFFIX_RANKS)
        
-    def remove_html_tags(self, text: str) -> str:
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', ' ', text)
-        # Remove URLs
-        text = re.sub(r'http\S+', ' ', text)
-        text = re.sub(r'www\.\S+', ' ', text)
-        # Remove emails
-        text = re.sub(r'\S+@\S+', ' ', text)
-        return text
+    def remove_html_tags(self, text: str, counts: Counter = None) -> str:
+        # Remove HTML tags, URLs and emails
+        return _apply_patterns(text, _HTML_PATTERNS, counts)
     
     def remove_unbalanced_brackets(self, text: str) -> str:
         """
@@ -358,27 +1173,262 @@ class PersianNormalizer:
         
         return ''.join(result)
 
-    def convert_abbreviations_to_text(self, text: str) -> str:
-        patterns = [
-            (r'\(ص\)', ' صلی‌الله‌علیه‌وآله '),
-            (r'\(ع\)', ' علیه‌السلام '),
-            (r'\(س\)', ' سلام‌الله‌علیها '),
-            (r'\(ره\)', ' رحمت‌الله‌علیه '),
-            (r'\(رض\)', ' رضی‌الله‌عنه '),
-            (r'\(عج\)', ' عجل‌الله‌تعالی‌فرجه '),
-            (r'\bه\.\s*ق\.?', ' هجری قمری '),
-            (r'\bه\.\s*ش\.?', ' هجری شمسی '),
-            (r'\bق\.\s*م\.?', ' قبل از میلاد '),
-            (r'\bر\.\s*ک\.?', ' رجوع کنید به '),
-            (r'\bص\.', ' صفحه '),
-            (r'\bج\.', ' جلد '),
-        ]
-        for pattern in patterns:
-            text = re.sub(pattern[0], pattern[1], text, flags=re.MULTILINE)
-        return text
+    def convert_abbreviations_to_text(self, text: str, counts: Counter = None) -> str:
+        return _apply_patterns(text, _ABBREVIATION_PATTERNS, counts)
+
+# pyarrow.compute versions of the character-level steps, see normalize_arrow.
+# The kernels use RE2, whose \s and \S are ASCII only, so whitespace is spelled out:
+# these are exactly the characters Python's \s and str.strip() treat as whitespace.
+_WHITESPACE_CHARS = (
+    '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005'
+    '\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000'
+)
+
+
+def _re2_class(chars: Iterable[str], negate: bool = False) -> str:
+    return '[' + ('^' if negate else '') + ''.join(f'\\x{{{ord(char):x}}}' for char in sorted(set(chars))) + ']'
+
+
+_RE2_SPACE = _re2_class(_WHITESPACE_CHARS)
+_RE2_NON_SPACE = _re2_class(_WHITESPACE_CHARS, negate=True)
+
+# (trigger, rules): rows not matching trigger are left alone, the rest get every rule in order
+_ARROW_HTML_RULES = ('<|http|www|@', (
+    ('<[^>]+>', ' '),
+    (f'http{_RE2_NON_SPACE}+', ' '),
+    (f'www\\.{_RE2_NON_SPACE}+', ' '),
+    (f'{_RE2_NON_SPACE}+@{_RE2_NON_SPACE}+', ' '),
+))
+# same as \s+ -> ' ', without rewriting every single space
+_ARROW_WHITESPACE_RULES = (f'{_re2_class(_WHITESPACE_CHARS.replace(" ", ""))}|  ', (
+    (f'{_RE2_SPACE}+', ' '),
+))
+_ARROW_EMOJI_RULES = ('[\\x{1f600}-\\x{1f64f}]', (
+    ('[\\x{1f600}-\\x{1f64f}]', ''),
+))
+
+
+def _arrow_translation_rules(table: dict) -> tuple:
+    # one replacement per destination character; no destination is itself mapped, so the
+    # sequential replacements give the same result as str.translate
+    sources = {}
+    for source, destination in table.items():
+        if source != destination:
+            sources.setdefault(destination, []).append(chr(source))
+    trigger = _re2_class(chr(source) for source, destination in table.items() if source != destination)
+    return trigger, tuple((_re2_class(chars), chr(destination)) for destination, chars in sources.items())
+
+
+_ARROW_TRANSLATION_RULES = _arrow_translation_rules(_TRANSLATIONS)
+_ARROW_PERSIAN_NUMBER_RULES = _arrow_translation_rules(_PERSIAN_NUMBER_TRANSLATIONS)
+
+# plan stages with an Arrow implementation; everything else runs per text in Python
+_ARROW_STAGES = {
+    'persian_number': _ARROW_PERSIAN_NUMBER_RULES,
+    'remove_emoji': _ARROW_EMOJI_RULES,
+}
+
+
+def _arrow_apply(texts, rules: tuple):
+    import pyarrow.compute as pc
+
+    trigger, replacements = rules
+    mask = pc.match_substring_regex(texts, trigger)
+    if not pc.any(mask).as_py():
+        return texts
+    matched = pc.filter(texts, mask)
+    for pattern, replacement in replacements:
+        matched = pc.replace_substring_regex(matched, pattern, replacement)
+    return pc.replace_with_mask(texts, mask, matched)
+
+
+def _python_stages(normalizer: 'PersianNormalizer', texts, stages: List[tuple]):
+    import pyarrow as pa
+
+    if not stages:
+        return texts
+    stages = tuple(stages)
+    normalized = [None if text is None else normalizer._run_plan(text, stages, _prescan(text)) for text in texts.to_pylist()]
+    return pa.array(normalized, type=texts.type)
+
+
+def normalize_arrow(normalizer: 'PersianNormalizer', texts):
+    """
+    Normalize a pyarrow string array, giving the same texts as normalizer.normalize on each element.
+
+    HTML/URL removal, whitespace collapsing, the translation table, Persian digits and emoji removal
+    run as pyarrow.compute kernels over the whole array; the context-sensitive stages between them
+    run per text in Python. The sentence cache and the profile of the normalizer are not used.
+
+    Args:
+        texts: pyarrow.Array or ChunkedArray of strings; nulls stay null
+
+    Returns:
+        pyarrow.Array of the normalized texts
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if isinstance(texts, pa.ChunkedArray):
+        texts = texts.combine_chunks()
+    texts = _arrow_apply(texts, _ARROW_HTML_RULES)
+    texts = _arrow_apply(texts, _ARROW_WHITESPACE_RULES)
+    texts = pc.utf8_trim(texts, _WHITESPACE_CHARS)
+    texts = _arrow_apply(texts, _ARROW_TRANSLATION_RULES)
+
+    pending = []
+    for name, stage in normalizer._plan:
+        rules = _ARROW_STAGES.get(name)
+        if rules is None:
+            pending.append((name, stage))
+            continue
+        texts = _python_stages(normalizer, texts, pending)
+        pending = []
+        texts = _arrow_apply(texts, rules)
+    return _python_stages(normalizer, texts, pending)
+
+
+# Each pool worker builds its own normalizer once, see PersianNormalizer.normalize_batch
+_worker_normalizer = None
+
+
+def _init_worker(cls: type, options: dict, cache: NormalizationCache = None, profile: bool = False) -> None:
+    global _worker_normalizer
+    # the same class as the parent's, so a subclass overriding stages behaves the same in workers
+    _worker_normalizer = cls(**options, profile=profile)
+    _worker_normalizer.cache = cache
+    if cache is not None:
+        cache.reset_stats()  # a forked copy starts with the parent's counters
+
+
+def _normalize_chunk(texts: List[str]) -> tuple:
+    normalized = [_worker_normalizer.normalize(text) for text in texts]
+
+    # hand this chunk's profile, prescan and cache counters back to the parent, which merges them
+    cache = _worker_normalizer.cache
+    cache_stats = None
+    if cache is not None:
+        cache.commit()
+        cache_stats = cache.counters()
+        cache.reset_stats()
+    skipped = _worker_normalizer.skip_stats()
+    _worker_normalizer.reset_skip_stats()
+    profile = _worker_normalizer.profile
+    if profile is not None:
+        _worker_normalizer.profile = NormalizerProfile()
+        return normalized, profile.to_dict(), skipped, cache_stats
+    return normalized, None, skipped, cache_stats
+
+
+def _read_checkpoint(checkpoint_path: str) -> dict:
+    if not os.path.exists(checkpoint_path):
+        return {'input_offset': 0, 'output_size': 0, 'lines': 0}
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_checkpoint(checkpoint_path: str, checkpoint: dict) -> None:
+    # write then rename, so a crash never leaves a half written checkpoint
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def normalize_file(
+    input_path: str,
+    output_path: str,
+    normalizer: PersianNormalizer = None,
+    workers: int = 1,
+    chunksize: int = 1000,
+    checkpoint_every: int = 100000,
+    buffer_size: int = 1 << 22,
+) -> int:
+    """
+    Stream a text file through the normalizer, one output line per input line.
+
+    Every checkpoint_every lines the input byte offset and the output size are saved to
+    output_path + '.checkpoint'. A restarted run seeks straight to that offset and
+    truncates the output to the recorded size, instead of re-reading the input.
+
+    Returns:
+        total number of lines written, including those of previous runs
+    """
+    normalizer = normalizer or PersianNormalizer()
+    checkpoint_path = output_path + '.checkpoint'
+    checkpoint = _read_checkpoint(checkpoint_path)
+    if checkpoint['lines']:
+        print(f"Resuming after line {checkpoint['lines']} (input byte {checkpoint['input_offset']})")
+
+    offsets = deque()  # input offset after each line that is still in flight
+
+    def read_lines(infile):
+        offset = checkpoint['input_offset']
+        for line in infile:
+            offset += len(line)
+            offsets.append(offset)
+            yield line.decode('utf-8').rstrip('\r\n')
+
+    mode = 'r+b' if os.path.exists(output_path) else 'wb'
+    with open(input_path, 'rb') as infile, open(output_path, mode, buffering=buffer_size) as outfile:
+        infile.seek(checkpoint['input_offset'])
+        outfile.truncate(checkpoint['output_size'])
+        outfile.seek(checkpoint['output_size'])
+
+        lines = checkpoint['lines']
+        for result in normalizer.normalize_batch(read_lines(infile), workers=workers, chunksize=chunksize):
+            outfile.write((result + '\n').encode('utf-8'))
+            input_offset = offsets.popleft()
+            lines += 1
+            if lines % checkpoint_every == 0:
+                outfile.flush()
+                os.fsync(outfile.fileno())
+                _write_checkpoint(checkpoint_path, {
+                    'input_offset': input_offset, 'output_size': outfile.tell(), 'lines': lines,
+                })
+                print(f"Processed {lines} lines")
+
+        outfile.flush()
+        _write_checkpoint(checkpoint_path, {
+            'input_offset': infile.tell(), 'output_size': outfile.tell(), 'lines': lines,
+        })
+
+    print(f"Done, {lines} lines written to {output_path}")
+    return lines
+
 
 if __name__=='__main__':
-    sentence = "من می خواهم که این متون فارسی را پردازش میکنم"
-    norm = PersianNormalizer()
-    output = norm.normalize(sentence)
-    print(output)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Normalize Persian text, one sentence per line.")
+    parser.add_argument('input', nargs='?', help="input text file")
+    parser.add_argument('output', nargs='?', help="output text file (resumes from output.checkpoint if present)")
+    parser.add_argument('--text', default="من می خواهم که این متون فارسی را پردازش میکنم",
+                        help="normalize and print this sentence when no input file is given")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunksize', type=int, default=1000)
+    parser.add_argument('--checkpoint-every', type=int, default=100000)
+    parser.add_argument('--cache', default=None, help="sqlite file caching normalized sentences across runs")
+    parser.add_argument('--profile', default=None, help="write per-stage timings to this .json or .csv file")
+    parser.add_argument('--stages', default=None,
+                        help=f"comma separated stage order (default: {','.join(DEFAULT_STAGES)})")
+    args = parser.parse_args()
+
+    stages = None if args.stages is None else [name.strip() for name in args.stages.split(',') if name.strip()]
+    norm = PersianNormalizer(stages=stages, cache_path=args.cache, profile=args.profile is not None)
+    if args.input is None:
+        print(norm.normalize(args.text))
+    else:
+        if args.output is None:
+            parser.error("output is required when input is given")
+        normalize_file(args.input, args.output, norm, workers=args.workers, chunksize=args.chunksize,
+                       checkpoint_every=args.checkpoint_every)
+        print(f"Prescan: {norm.skip_stats()}")
+        if norm.cache is not None:
+            norm.cache.commit()
+            print(f"Cache: {norm.cache.stats()}")
+            norm.cache.close()
+    if args.profile:
+        if args.profile.endswith('.csv'):
+            norm.profile.to_csv(args.profile)
+        else:
+            norm.profile.to_json(args.profile)
+        print(f"Profile written to {args.profile}")
@@ -0,0 +1,203 @@
+"""
+Compact columnar storage for phonemized corpora.
+
+Instead of nested lists of phoneme strings per sentence, a corpus is stored as flat arrays in
+one directory, memory-mapped on read:
+    symbols.u8           phoneme symbol ids (text_utils.symbols, encoded like TextCleaner), uint8
+    input_ids.i32        token ids, one per token, int32
+    token_ends.i32       end of each token's symbols, relative to its sentence start, int32
+    sentence_tokens.i64  token offset of every sentence (+ end), int64
+    sentence_symbols.i64 symbol offset of every sentence (+ end), int64
+    meta.json            counts and dtypes
+"""
+
+import json
+import mmap
+import os
+
+import numpy as np
+
+from text_utils import dicts, symbols
+
+# TextCleaner maps characters outside text_utils.symbols to 'U'
+_UNKNOWN_SYMBOL = dicts['U']
+
+_COLUMNS = {
+    'symbols': ('symbols.u8', np.uint8),
+    'input_ids': ('input_ids.i32', np.int32),
+    'token_ends': ('token_ends.i32', np.int32),
+    'sentence_tokens': ('sentence_tokens.i64', np.int64),
+    'sentence_symbols': ('sentence_symbols.i64', np.int64),
+}
+
+
+class _SymbolTable(dict):
+    # str.translate table: character -> symbol id as a character, unknown characters -> 'U'
+    def __missing__(self, key):
+        return _UNKNOWN_SYMBOL
+
+
+_SYMBOL_TABLE = _SymbolTable({ord(char): index for char, index in dicts.items()})
+
+
+def encode_phonemes(phonemes):
+    """Symbol ids of a phoneme string as a uint8 array, the same ids TextCleaner gives."""
+    return np.frombuffer(phonemes.translate(_SYMBOL_TABLE).encode('latin-1'), dtype=np.uint8)
+
+
+def decode_symbols(symbol_ids):
+    """Phoneme string of symbol ids (characters TextCleaner did not know come back as 'U')."""
+    return ''.join(symbols[i] for i in symbol_ids)
+
+
+class PhonemeArrayWriter:
+    """
+    Append phonemized sentences to a directory of flat arrays.
+    Columns are streamed to disk as they grow, so memory stays bounded on large corpora.
+
+    Example:
+        with PhonemeArrayWriter(directory) as writer:
+            writer.add_batch(phonemize_batch(texts, tokenizer))
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._files = {name: open(os.path.join(directory, file_name), 'wb')
+                       for name, (file_name, _) in _COLUMNS.items()}
+        self.sentences = 0
+        self.tokens = 0
+        self.total_symbols = 0
+        self._files['sentence_tokens'].write(np.zeros(1, dtype=np.int64).tobytes())
+        self._files['sentence_symbols'].write(np.zeros(1, dtype=np.int64).tobytes())
+
+    def add(self, input_ids, phonemes):
+        """Append one sentence, given as phonemize() returns it."""
+        encoded = [encode_phonemes(p) for p in phonemes]
+        token_ends = np.cumsum([len(e) for e in encoded], dtype=np.int32)
+        sentence_symbols = np.concatenate(encoded) if encoded else np.zeros(0, dtype=np.uint8)
+
+        self._files['symbols'].write(sentence_symbols.tobytes())
+        self._files['input_ids'].write(np.asarray(input_ids, dtype=np.int32).tobytes())
+        self._files['token_ends'].write(token_ends.tobytes())
+
+        self.sentences += 1
+        self.tokens += len(input_ids)
+        self.total_symbols += len(sentence_symbols)
+        self._files['sentence_tokens'].write(np.int64(self.tokens).tobytes())
+        self._files['sentence_symbols'].write(np.int64(self.total_symbols).tobytes())
+
+    def add_batch(self, batch):
+        """Append the sentences of a phonemize_batch() result (or any {'input_ids', 'phonemes'} batch)."""
+        for input_ids, phonemes in zip(batch['input_ids'], batch['phonemes']):
+            self.add(input_ids, phonemes)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        meta = {
+            'sentences': self.sentences,
+            'tokens': self.tokens,
+            'symbols': self.total_symbols,
+            'columns': {name: [file_name, np.dtype(dtype).str] for name, (file_name, dtype) in _COLUMNS.items()},
+        }
+        with open(os.path.join(self.directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_phoneme_arrays(directory, records):
+    """
+    Write records ({'input_ids': [...], 'phonemes': [...]} per sentence, e.g. a phonemized
+    HuggingFace Dataset saved by preprocess_fa.ipynb) as phoneme arrays.
+    """
+    with PhonemeArrayWriter(directory) as writer:
+        for record in records:
+            writer.add(record['input_ids'], record['phonemes'])
+        return writer.sentences
+
+
+def _memmap(directory, name, length):
+    # a plain ndarray over the mapping: slicing it is cheaper than slicing an np.memmap
+    file_name, dtype = _COLUMNS[name]
+    if length == 0:
+        return np.zeros(0, dtype=dtype)  # an empty file cannot be mapped
+    with open(os.path.join(directory, file_name), 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(buffer, dtype=dtype, count=length)
+
+
+class PhonemeArrays:
+    """
+    Read-only, memory-mapped view of a directory written by PhonemeArrayWriter.
+    Indexing returns views into the mapped files, nothing is copied or decoded.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.symbols = _memmap(directory, 'symbols', self.meta['symbols'])
+        self.input_ids = _memmap(directory, 'input_ids', self.meta['tokens'])
+        self.token_ends = _memmap(directory, 'token_ends', self.meta['tokens'])
+        self.sentence_tokens = _memmap(directory, 'sentence_tokens', self.meta['sentences'] + 1)
+        self.sentence_symbols = _memmap(directory, 'sentence_symbols', self.meta['sentences'] + 1)
+
+    def __len__(self):
+        return self.meta['sentences']
+
+    def __reduce__(self):
+        # DataLoader workers reopen the mapping instead of receiving a copy of the arrays
+        return PhonemeArrays, (self.directory,)
+
+    def __getitem__(self, idx):
+        """
+        Returns:
+            dict with views of one sentence:
+            - input_ids: token ids (int32)
+            - symbols: symbol ids of all its phonemes, token after token (uint8)
+            - token_ends: end of every token in symbols (int32)
+        """
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        t0, t1 = self.sentence_tokens[idx], self.sentence_tokens[idx + 1]
+        s0, s1 = self.sentence_symbols[idx], self.sentence_symbols[idx + 1]
+        return {
+            'input_ids': self.input_ids[t0:t1],
+            'symbols': self.symbols[s0:s1],
+            'token_ends': self.token_ends[t0:t1],
+        }
+
+    def phonemes(self, idx):
+        """The sentence as phonemize() returned it: {'input_ids': [...], 'phonemes': [...]} (for inspection)."""
+        sentence = self[idx]
+        starts = np.concatenate(([0], sentence['token_ends'][:-1]))
+        return {
+            'input_ids': sentence['input_ids'].tolist(),
+            'phonemes': [decode_symbols(sentence['symbols'][s:e]) for s, e in zip(starts, sentence['token_ends'])],
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert a phonemized dataset (save_to_disk) to phoneme arrays.")
+    parser.add_argument('dataset', help="directory of a phonemized HuggingFace dataset")
+    parser.add_argument('output', help="directory for the phoneme arrays")
+    args = parser.parse_args()
+
+    from datasets import load_from_disk
+    dataset = load_from_disk(args.dataset)
+    count = write_phoneme_arrays(args.output, dataset)
+
+    arrays = PhonemeArrays(args.output)
+    dataset_bytes = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(args.dataset) for f in files)
+    arrays_bytes = sum(os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output))
+    print(f"Wrote {count} sentences, {arrays.meta['tokens']} tokens, {arrays.meta['symbols']} symbols")
+    print(f"Disk: {dataset_bytes / 1e6:.2f} MB dataset -> {arrays_bytes / 1e6:.2f} MB arrays")
@@ -0,0 +1,263 @@
+"""
+Offline pronunciation lexicon for phonemize_fa.
+Scans a corpus once, phonemizes every distinct word with vaguye (in parallel) and writes a
+sorted, memory-mappable lexicon file: word -> (phoneme string, token ids).
+
+phonemize_fa looks words up in it (see phonemize_fa.set_lexicon or $PHONEME_LEXICON) before
+calling vaguye, so all preprocessing workers share one page-cached file. The file records the
+phonemizer it was built with (phonemize_fa.phonemizer_tag) and is refused by any other.
+
+Usage:
+    python phoneme_lexicon.py ./datasets/wikipedia-fa-cleaned.txt ./datasets/lexicon.bin \
+        --tokenizer HooshvareLab/bert-base-parsbert-uncased --workers 26
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# File layout (little endian):
+#   header: magic, number of words, length of the JSON metadata
+#   metadata: JSON (tokenizer it was built with, counts, ...)
+#   index: (count + 1) uint64 record offsets, records sorted by the UTF-8 bytes of the word
+#   record: uint16 word length, word, uint16 phonemes length, phonemes, uint16 id count, uint32 ids
+_MAGIC = b'FALEXv1\0'
+_HEADER = struct.Struct('<8sQI')
+_OFFSET = struct.Struct('<Q')
+_LENGTH = struct.Struct('<H')
+_MAX_LENGTH = 0xFFFF
+
+
+def write_lexicon(path, entries, meta=None):
+    """
+    Write a lexicon file.
+
+    Args:
+        path: output file, replaced atomically
+        entries: iterable of (word, phonemes, token_ids); token_ids may be empty
+        meta: JSON-serializable dict stored in the header (e.g. the tokenizer fingerprint)
+
+    Raises:
+        ValueError: if a word or its phonemes are over 65535 UTF-8 bytes, or it has over 65535 token ids
+    """
+    records = []
+    for word, phonemes, token_ids in entries:
+        word_bytes = word.encode('utf-8')
+        phoneme_bytes = phonemes.encode('utf-8')
+        if max(len(word_bytes), len(phoneme_bytes), len(token_ids)) > _MAX_LENGTH:
+            raise ValueError(f"Lexicon entry {word[:40]!r}... too long: {len(word_bytes)} word bytes, "
+                             f"{len(phoneme_bytes)} phoneme bytes, {len(token_ids)} token ids (max {_MAX_LENGTH} each)")
+        records.append((word_bytes, _LENGTH.pack(len(word_bytes)) + word_bytes
+                        + _LENGTH.pack(len(phoneme_bytes)) + phoneme_bytes
+                        + _LENGTH.pack(len(token_ids)) + struct.pack(f'<{len(token_ids)}I', *token_ids)))
+    records.sort(key=lambda record: record[0])
+
+    meta_bytes = json.dumps(meta or {}, ensure_ascii=False).encode('utf-8')
+    data_start = _HEADER.size + len(meta_bytes) + _OFFSET.size * (len(records) + 1)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(records), len(meta_bytes)))
+        f.write(meta_bytes)
+        offset = data_start
+        for _, record in records:
+            f.write(_OFFSET.pack(offset))
+            offset += len(record)
+        f.write(_OFFSET.pack(offset))
+        for _, record in records:
+            f.write(record)
+    os.replace(tmp_path, path)
+
+
+class PhonemeLexicon:
+    """
+    Read-only view of a lexicon file. Lookups binary-search the memory-mapped file,
+    nothing is loaded up front, so processes opening the same file share its pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, meta_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a phoneme lexicon")
+        self.meta = json.loads(self._mmap[_HEADER.size:_HEADER.size + meta_length])
+        self._index = _HEADER.size + meta_length
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        return self._find(word) is not None
+
+    def __reduce__(self):
+        # pool workers reopen (and so share) the mapping instead of receiving a copy
+        return PhonemeLexicon, (self.path,)
+
+    def _word_at(self, offset):
+        length, = _LENGTH.unpack_from(self._mmap, offset)
+        return self._mmap[offset + 2:offset + 2 + length]
+
+    def _find(self, word):
+        key = word.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, = _OFFSET.unpack_from(self._mmap, self._index + mid * _OFFSET.size)
+            found = self._word_at(offset)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return offset
+        return None
+
+    def get(self, word):
+        """Return (phonemes, token_ids) of word, or None if it is not in the lexicon."""
+        offset = self._find(word)
+        if offset is None:
+            return None
+        offset += 2 + _LENGTH.unpack_from(self._mmap, offset)[0]
+        length, = _LENGTH.unpack_from(self._mmap, offset)
+        phonemes = self._mmap[offset + 2:offset + 2 + length].decode('utf-8')
+        offset += 2 + length
+        count, = _LENGTH.unpack_from(self._mmap, offset)
+        token_ids = struct.unpack_from(f'<{count}I', self._mmap, offset + 2)
+        return phonemes, token_ids
+
+    def matches(self, tokenizer):
+        """Whether the stored token ids were made by this tokenizer."""
+        return (self.meta.get('tokenizer') is not None
+                and self.meta.get('tokenizer') == getattr(tokenizer, 'name_or_path', None)
+                and self.meta.get('vocab_size') == len(tokenizer))
+
+    def close(self):
+        self._mmap.close()
+
+
+def tokenizer_fingerprint(tokenizer):
+    """Metadata identifying the tokenizer the token ids of a lexicon belong to."""
+    if tokenizer is None:
+        return {'tokenizer': None, 'vocab_size': None}
+    return {'tokenizer': tokenizer.name_or_path, 'vocab_size': len(tokenizer)}
+
+
+def _phonemize_words(words):
+    from phonemize_fa import _vaguye_phonemize
+    return [_vaguye_phonemize(word) for word in words]
+
+
+def count_words(corpus_path, normalize=True, workers=1):
+    """
+    Count the raw words (as phonemize_fa splits them) of a text file with one sentence per line.
+
+    Args:
+        corpus_path: text file
+        normalize: run the phonemize_fa normalizer first; False if the file is already normalized
+        workers: processes for the normalization
+    """
+    from phonemize_fa import get_normalizer
+
+    counts = Counter()
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        lines = (line for line in lines if line)  # Skip empty lines
+        if normalize:
+            lines = get_normalizer().normalize_batch(lines, workers=workers)
+        for n, line in enumerate(lines, 1):
+            counts.update(line.split())
+            if n % 100000 == 0:
+                print(f"Counted {n} lines, {len(counts)} unique words")
+    return counts
+
+
+def build_lexicon(corpus_path, output_path, tokenizer=None, workers=1, min_count=1, normalize=True,
+                  chunksize=1000):
+    """
+    Build a lexicon of every word of a corpus seen at least min_count times.
+
+    Args:
+        corpus_path: text file, one sentence per line
+        output_path: lexicon file to write
+        tokenizer: HuggingFace tokenizer whose token ids are stored with each word (optional)
+        workers: processes for normalizing and phonemizing
+        min_count: skip rarer words, they are phonemized on the fly
+        normalize: see count_words
+        chunksize: words per phonemizer task
+    """
+    start = time.perf_counter()
+    counts = count_words(corpus_path, normalize=normalize, workers=workers)
+    words = sorted(word for word, count in counts.items() if count >= min_count)
+    print(f"{len(counts)} unique words, phonemizing {len(words)} seen at least {min_count} times")
+
+    chunks = iter(lambda it=iter(words): list(islice(it, chunksize)), [])
+    if workers <= 1:
+        phonemes = [p for chunk in chunks for p in _phonemize_words(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            phonemes = [p for chunk in pool.map(_phonemize_words, chunks) for p in chunk]
+
+    token_ids = [()] * len(words)
+    if tokenizer is not None:
+        token_ids = [tokenizer.convert_tokens_to_ids(tokenizer.tokenize(word)) for word in words]
+
+    # words vaguye failed on stay out of the lexicon and are retried at runtime, and so do
+    # the (garbage) words too long for its uint16 lengths
+    failed = sum(p is None for p in phonemes)
+    too_long = [word for word, p, ids in zip(words, phonemes, token_ids)
+                if p is not None and max(len(word.encode('utf-8')), len(p.encode('utf-8')), len(ids)) > _MAX_LENGTH]
+    if failed:
+        print(f"vaguye failed on {failed} words, leaving them out")
+    if too_long:
+        print(f"{len(too_long)} words over {_MAX_LENGTH} bytes, leaving them out")
+    if failed or too_long:
+        too_long = set(too_long)
+        kept = [(word, p, ids) for word, p, ids in zip(words, phonemes, token_ids)
+                if p is not None and word not in too_long]
+        words = [word for word, _, _ in kept]
+        phonemes = [p for _, p, _ in kept]
+        token_ids = [ids for _, _, ids in kept]
+
+    from phonemize_fa import phonemizer_tag
+    meta = tokenizer_fingerprint(tokenizer)
+    meta.update({'phonemizer': phonemizer_tag(), 'words': len(words), 'min_count': min_count,
+                 'covered_tokens': sum(counts[word] for word in words), 'total_tokens': sum(counts.values())})
+    write_lexicon(output_path, zip(words, phonemes, token_ids), meta)
+    print(f"Wrote {len(words)} words to {output_path} in {time.perf_counter() - start:.1f}s")
+    return meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a memory-mapped pronunciation lexicon for phonemize_fa.")
+    parser.add_argument('corpus', nargs='?', help="text file, one sentence per line")
+    parser.add_argument('output', nargs='?', help="lexicon file to write")
+    parser.add_argument('--tokenizer', default=None, help="HuggingFace tokenizer whose token ids are stored")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--min-count', type=int, default=1)
+    parser.add_argument('--no-normalize', action='store_true', help="the corpus is already normalized")
+    parser.add_argument('--lookup', nargs='*', default=None, help="print the entries of these words and exit")
+    args = parser.parse_args()
+
+    if args.lookup is not None:
+        lexicon = PhonemeLexicon(args.output or args.corpus)
+        print(f"{len(lexicon)} words, {lexicon.meta}")
+        for word in args.lookup:
+            print(word, lexicon.get(word))
+        raise SystemExit(0)
+
+    if args.output is None:
+        parser.error("corpus and output are required")
+    tokenizer = None
+    if args.tokenizer:
+        from transformers import BertTokenizer
+        tokenizer = BertTokenizer.from_pretrained(args.tokenizer)
+    build_lexicon(args.corpus, args.output, tokenizer, workers=args.workers, min_count=args.min_count,
+                  normalize=not args.no_normalize)
@@ -4,29 +4,713 @@ Adapted for Persian language from the original phonemize.py (English version).
 Includes text normalization using pernorm before phonemization.
 """
 
-from vaguye import PersianPhonemizer
+import importlib.metadata
+import multiprocessing
+import os
+import re
+import sqlite3
+import string
+import time
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 # from pernorm.normalizer import PersianNormalizer
-from local_normalizer import PersianNormalizer
+from local_normalizer import NUMBER_WORDS, PersianNormalizer
+from phoneme_lexicon import PhonemeLexicon
 
 
 # Global variables for lazy loading
 _global_phonemizer = None
 _global_normalizer = None
+_global_lexicon = None  # False once $PHONEME_LEXICON was found unset
+_lexicon_checked = False  # whether the lexicon was checked against the current phonemizer
+_global_shared_cache = None  # False once $PHONEME_SHARED_CACHE was found unset
+_global_tokenizer = None  # default tokenizer of phonemize/phonemize_batch, see preload
+_global_supervisor = None  # False once $PHONEME_TIMEOUT was found unset
+
+# Optional prebuilt lexicon file (see phoneme_lexicon.py) consulted before vaguye
+PHONEME_LEXICON_ENV = 'PHONEME_LEXICON'
+# Optional sqlite file of phonemes shared by all worker processes, see SharedPhonemeCache
+PHONEME_SHARED_CACHE_ENV = 'PHONEME_SHARED_CACHE'
+# Optional per-word time budget (seconds) for vaguye and the file of words that ran over it
+PHONEME_TIMEOUT_ENV = 'PHONEME_TIMEOUT'
+PHONEME_QUARANTINE_ENV = 'PHONEME_QUARANTINE'
 
 def get_phonemizer():
     global _global_phonemizer
     if _global_phonemizer is None:
+        from vaguye import PersianPhonemizer
         _global_phonemizer = PersianPhonemizer()
     return _global_phonemizer
 
+def phonemizer_tag(phonemizer=None):
+    """
+    Identity of a phonemizer (default: the current one), its class and version, e.g.
+    'PersianPhonemizer 1.2.0'. The version is its version attribute if it has one, else the
+    installed version of its package.
+    """
+    if phonemizer is None:
+        if _global_phonemizer is None:
+            # vaguye, without loading it here (pool workers or the supervisor's helper will)
+            try:
+                return f"PersianPhonemizer {importlib.metadata.version('vaguye')}"
+            except importlib.metadata.PackageNotFoundError:
+                return "PersianPhonemizer unknown"
+        phonemizer = _global_phonemizer
+    version = getattr(phonemizer, 'version', None)
+    if version is None:
+        try:
+            version = importlib.metadata.version(type(phonemizer).__module__.split('.')[0])
+        except (importlib.metadata.PackageNotFoundError, ValueError):
+            version = 'unknown'
+    return f"{type(phonemizer).__qualname__} {version}"
+
+def set_phonemizer(phonemizer):
+    """Use phonemizer (anything with phonemize(word) -> str) instead of vaguye, and clear the word cache."""
+    global _global_phonemizer, _lexicon_checked
+    _global_phonemizer = phonemizer
+    _lexicon_checked = False  # the lexicon must have been built with the new phonemizer
+    _cached_phonemize_word.cache_clear()
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.close()  # reopening checks the file belongs to the new phonemizer
+    supervisor = get_phonemizer_supervisor()
+    if supervisor is not None:
+        supervisor.close()  # restarts with the new phonemizer
+
 def get_normalizer():
     global _global_normalizer
     if _global_normalizer is None:
         _global_normalizer = PersianNormalizer()
     return _global_normalizer
 
+def get_lexicon():
+    global _global_lexicon, _lexicon_checked
+    if _global_lexicon is None:
+        path = os.environ.get(PHONEME_LEXICON_ENV)
+        _global_lexicon = PhonemeLexicon(path) if path and os.path.exists(path) else False
+    if _global_lexicon is False:
+        return None
+    if not _lexicon_checked:
+        _check_lexicon(_global_lexicon)
+        _lexicon_checked = True
+    return _global_lexicon
+
+def _check_lexicon(lexicon):
+    # like SharedPhonemeCache: phonemes of another phonemizer (version) are not served
+    tag = phonemizer_tag()
+    built_with = lexicon.meta.get('phonemizer')
+    if built_with != tag:
+        raise ValueError(f"Lexicon {lexicon.path} was built with {built_with or 'an unknown phonemizer'}, "
+                         f"not {tag}; rebuild it with phoneme_lexicon.py")
+
+def set_lexicon(path):
+    """
+    Look words up in the lexicon file at path before calling vaguye (None to stop using one).
+    Set it before starting pool workers, so forked workers share the mapping.
+    The lexicon must have been built with the current phonemizer, checked on first use.
+    """
+    global _global_lexicon, _lexicon_checked
+    _global_lexicon = PhonemeLexicon(path) if path is not None else False
+    _lexicon_checked = False
+    clear_caches()
+
+def get_tokenizer():
+    """The tokenizer phonemize() and phonemize_batch() use when none is passed (see preload), or None."""
+    return _global_tokenizer
+
+def _resolve_tokenizer(tokenizer):
+    if tokenizer is None:
+        tokenizer = _global_tokenizer
+        if tokenizer is None:
+            raise ValueError("No tokenizer given and none preloaded, see phonemize_fa.preload")
+    return tokenizer
+
+
+# Word frequencies are Zipfian, so a word -> phonemes cache in front of vaguye
+# avoids most phonemizer calls. Size per process, overridable for pool workers.
+PHONEME_CACHE_SIZE = int(os.environ.get('PHONEME_CACHE_SIZE', 200000))
+
+
+class SharedPhonemeCache:
+    """
+    Word -> phonemes cache in a sqlite file, read and filled by many processes at once
+    (e.g. the pebble shard workers of preprocess_fa.ipynb), so a word is phonemized about
+    once per corpus instead of once per worker.
+
+    The file is tied to one phonemizer: its phonemizer_tag() is stored on first use and a
+    process with a different phonemizer (another vaguye version, a stand-in) refuses to open it.
+    Only real phonemizations are stored, never the fallback of a failed call.
+
+    WAL mode lets readers run while another process writes. New entries are buffered and
+    written in one short INSERT OR IGNORE transaction every flush_every words or flush_interval
+    seconds, so writers hold the lock only briefly; the phonemizer is deterministic, so when two
+    workers add the same word, keeping the first is correct. A flush that cannot get the lock
+    keeps its entries for the next one. Each process opens its own connection on first use.
+    """
+
+    def __init__(self, path, flush_every=100, flush_interval=1.0, timeout=60):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}
+        self._connection = None
+        self._pid = None
+        self._last_flush = time.monotonic()
+
+    def __getstate__(self):
+        # sqlite connections cannot be pickled; the copy reconnects on first use
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_pending'] = {}
+        return state
+
+    @property
+    def connection(self):
+        # a connection inherited through fork must not be used, open a new one per process
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS phonemes (word TEXT PRIMARY KEY, phonemes TEXT NOT NULL) WITHOUT ROWID"
+            )
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._pid = os.getpid()
+            self._pending = {}
+            self._check_phonemizer()
+        return self._connection
+
+    def _check_phonemizer(self):
+        # the first process to use the file stores its phonemizer, the others must match it
+        tag = phonemizer_tag()
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        row = connection.execute("SELECT value FROM meta WHERE key = 'phonemizer'").fetchone()
+        if row is None and connection.execute("SELECT 1 FROM phonemes LIMIT 1").fetchone() is None:
+            connection.execute("INSERT INTO meta (key, value) VALUES ('phonemizer', ?)", (tag,))
+            row = (tag,)
+        connection.execute("COMMIT")
+        if row is None or row[0] != tag:
+            self._connection = None
+            connection.close()
+            raise ValueError(f"Phoneme cache {self.path} was filled by {row[0] if row else 'an unknown phonemizer'}, "
+                             f"not {tag}; delete it or use another path")
+
+    def get(self, word):
+        phonemes = self._pending.get(word)
+        if phonemes is None:
+            row = self.connection.execute("SELECT phonemes FROM phonemes WHERE word = ?", (word,)).fetchone()
+            phonemes = row[0] if row is not None else None
+        if phonemes is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return phonemes
+
+    def put(self, word, phonemes):
+        self._pending[word] = phonemes
+        if len(self._pending) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered entries; on lock timeout they stay buffered for the next flush."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        connection = self.connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("INSERT OR IGNORE INTO phonemes (word, phonemes) VALUES (?, ?)",
+                                   self._pending.items())
+            connection.execute("COMMIT")
+        except sqlite3.OperationalError as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            print(f"Phoneme cache flush postponed: {e}")
+            return
+        self._pending = {}
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM phonemes").fetchone()[0]
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self.flush()
+            self._connection.close()
+        self._connection = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'pending': len(self._pending),
+        }
+
+
+def get_shared_cache():
+    global _global_shared_cache
+    if _global_shared_cache is None:
+        path = os.environ.get(PHONEME_SHARED_CACHE_ENV)
+        _global_shared_cache = SharedPhonemeCache(path) if path else False
+    return _global_shared_cache if _global_shared_cache is not False else None
+
+def set_shared_cache(path, **kwargs):
+    """
+    Share phonemes with other processes through the sqlite file at path (None to stop).
+    Set it before starting pool workers; forked workers each open their own connection.
+    """
+    global _global_shared_cache
+    if _global_shared_cache is not None and _global_shared_cache is not False:
+        _global_shared_cache.close()
+    _global_shared_cache = SharedPhonemeCache(path, **kwargs) if path is not None else False
+    _cached_phonemize_word.cache_clear()
+
+def flush_shared_cache():
+    """Write the phonemes this process added to the shared cache (if any) so far."""
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.flush()
+
+
+# First message of a PhonemizerSupervisor helper, once its phonemizer is loaded
+_HELPER_READY = 'ready'
+
+
+def _phonemizer_helper(connection, phonemizer):
+    # helper process of PhonemizerSupervisor: phonemize words from the pipe until it is closed
+    global _global_phonemizer
+    if phonemizer is not None:
+        _global_phonemizer = phonemizer
+    phonemizer = get_phonemizer()
+    connection.send(_HELPER_READY)  # the per-word budget starts only after loading
+    while True:
+        try:
+            word = connection.recv()
+        except EOFError:
+            return
+        try:
+            phonemes = phonemizer.phonemize(word)
+        except Exception:
+            phonemes = None
+        connection.send(phonemes)
+
+
+class PhonemizerSupervisor:
+    """
+    Gives every phonemizer call at most timeout seconds, so one pathological word cannot hang a
+    whole shard (and lose its work to the pebble shard timeout).
+
+    The phonemizer runs in a helper process (a hung call in a thread could not be stopped).
+    A word that runs over the budget is appended to the quarantine file, the helper is killed
+    and restarted on the next call, and the word falls back to itself like a failed call.
+    Quarantined words, including those of earlier runs and of other workers sharing the file
+    (it is re-read whenever it grows), are not sent to the phonemizer again.
+    With fork the helper inherits the loaded phonemizer, so a restart is cheap; otherwise the
+    helper loads it first, with startup_timeout seconds for that before the per-word budget applies.
+    Each process (e.g. every pool worker) starts its own helper on first use.
+    """
+
+    def __init__(self, timeout, quarantine_path=None, startup_timeout=600):
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.quarantine_path = quarantine_path
+        self.quarantine = set()
+        self._quarantine_read = 0  # bytes of the quarantine file read so far
+        self._read_quarantine()
+        self.timeouts = 0
+        self.skipped = 0
+        self._process = None
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        # the helper belongs to the process that started it; the copy starts its own
+        state = self.__dict__.copy()
+        state['_process'] = None
+        state['_connection'] = None
+        return state
+
+    @property
+    def connection(self):
+        if self._process is None or self._pid != os.getpid():
+            fork = 'fork' in multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if fork else None)
+            self._connection, helper_connection = context.Pipe()
+            # loaded here once, so a forked helper starts (and restarts) with it
+            phonemizer = get_phonemizer() if fork else _global_phonemizer
+            self._process = context.Process(target=_phonemizer_helper, args=(helper_connection, phonemizer),
+                                            daemon=True)
+            self._process.start()
+            helper_connection.close()
+            self._pid = os.getpid()
+            try:
+                ready = self._connection.poll(self.startup_timeout) and self._connection.recv() == _HELPER_READY
+                reason = f"did not start within {self.startup_timeout}s"
+            except (EOFError, OSError):
+                ready = False
+                reason = "exited while loading the phonemizer (is vaguye installed?)"
+            if not ready:
+                self._stop(kill=True)
+                raise RuntimeError(f"Phonemizer helper {reason}")
+        return self._connection
+
+    def _read_quarantine(self):
+        # words appended to the file (by any process) since the last read; partial lines wait
+        if self.quarantine_path is None:
+            return
+        try:
+            size = os.path.getsize(self.quarantine_path)
+        except OSError:
+            return
+        if size == self._quarantine_read:
+            return
+        if size < self._quarantine_read:
+            self._quarantine_read = 0  # truncated, read it again
+        with open(self.quarantine_path, 'rb') as f:
+            f.seek(self._quarantine_read)
+            data = f.read(size - self._quarantine_read)
+        data = data[:data.rfind(b'\n') + 1]
+        self._quarantine_read += len(data)
+        self.quarantine.update(line for line in data.decode('utf-8').split('\n') if line.strip())
+
+    def phonemize(self, word):
+        """Phonemes of word, or None when the phonemizer failed, ran over the budget or the word is quarantined."""
+        self._read_quarantine()
+        if word in self.quarantine:
+            self.skipped += 1
+            return None
+        connection = self.connection
+        try:
+            connection.send(word)
+            if connection.poll(self.timeout):
+                return connection.recv()
+        except (EOFError, OSError):
+            pass  # the helper died on this word
+        self.timeouts += 1
+        print(f"Phonemizer crashed or ran over {self.timeout}s on {word!r}, quarantined")
+        self._add_to_quarantine(word)
+        self._stop(kill=True)
+        return None
+
+    def _add_to_quarantine(self, word):
+        self.quarantine.add(word)
+        if '\n' in word or '\r' in word:
+            print(f"{word!r} spans lines, quarantined for this process only")
+        elif self.quarantine_path is not None:
+            # one short append per word, safe with several workers sharing the file
+            with open(self.quarantine_path, 'a', encoding='utf-8') as f:
+                f.write(word + '\n')
+
+    def _stop(self, kill):
+        if self._process is not None and self._pid == os.getpid():
+            self._connection.close()  # a waiting helper exits on EOF
+            if kill:
+                self._process.kill()
+            self._process.join(timeout=self.timeout)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+        self._process = None
+        self._connection = None
+
+    def close(self):
+        self._stop(kill=False)
+
+    def stats(self):
+        return {
+            'timeouts': self.timeouts,
+            'skipped': self.skipped,
+            'quarantined': len(self.quarantine),
+        }
+
+
+def get_phonemizer_supervisor():
+    global _global_supervisor
+    if _global_supervisor is None:
+        timeout = os.environ.get(PHONEME_TIMEOUT_ENV)
+        _global_supervisor = (PhonemizerSupervisor(float(timeout), os.environ.get(PHONEME_QUARANTINE_ENV))
+                              if timeout else False)
+    return _global_supervisor if _global_supervisor is not False else None
+
+def set_phonemize_timeout(timeout, quarantine_path=None):
+    """
+    Give every vaguye call at most timeout seconds (None for no limit), see PhonemizerSupervisor.
+    Words that run over are appended to quarantine_path and skipped by later runs reading it.
+    """
+    global _global_supervisor
+    if _global_supervisor is not None and _global_supervisor is not False:
+        _global_supervisor.close()
+    _global_supervisor = PhonemizerSupervisor(timeout, quarantine_path) if timeout is not None else False
+    _cached_phonemize_word.cache_clear()
+
+
+class _PhonemizeFailed(Exception):
+    # raised out of _cached_phonemize_word so the LRU cache does not keep the fallback
+    pass
+
+
+def _phonemize_word(word):
+    # failures raise _PhonemizeFailed, so they are never stored and the word is retried next time
+    lexicon = get_lexicon()
+    if lexicon is not None:
+        entry = lexicon.get(word)
+        if entry is not None:
+            return entry[0]
+
+    shared_cache = get_shared_cache()
+    phonemes = shared_cache.get(word) if shared_cache is not None else None
+    if phonemes is None:
+        phonemes = _vaguye_phonemize(word)
+        if phonemes is None:
+            raise _PhonemizeFailed(word)
+        if shared_cache is not None:
+            shared_cache.put(word, phonemes)
+    return phonemes
+
+
+def _vaguye_phonemize(word):
+    # Phonemize the RAW word (preserves ZWNJ like in 'کتابخانه‌داری')
+    # None when vaguye fails, returns nothing, runs over the time budget or the word is quarantined
+    # A phonemizer that cannot be loaded is an error, not a per-word failure
+    supervisor = get_phonemizer_supervisor()
+    if supervisor is not None:
+        phonemes = supervisor.phonemize(word)
+    else:
+        phonemizer = get_phonemizer()
+        try:
+            phonemes = phonemizer.phonemize(word)
+        except Exception:
+            return None
+    if not phonemes or phonemes.strip() == '':
+        return None
+    return phonemes
+
+
+_cached_phonemize_word = lru_cache(maxsize=PHONEME_CACHE_SIZE)(_phonemize_word)
+
+
+def phonemize_word(word):
+    """
+    Phonemes of a single raw word, from the LRU cache, the lexicon, the shared cache or vaguye.
+    Falls back to the word itself when vaguye fails or returns nothing; that fallback is not
+    cached, the word is phonemized again the next time it comes up.
+    """
+    try:
+        return _cached_phonemize_word(word)
+    except _PhonemizeFailed:
+        return word
+
+
+def set_phoneme_cache_size(maxsize):
+    """
+    Replace the word phoneme cache with an empty one.
+
+    Args:
+        maxsize: maximum number of cached words (None for unbounded, 0 disables caching)
+    """
+    global _cached_phonemize_word
+    _cached_phonemize_word = lru_cache(maxsize=maxsize)(_phonemize_word)
+
+
+def phoneme_cache_info():
+    """Hits, misses, maxsize and current size of the word phoneme cache."""
+    return _cached_phonemize_word.cache_info()
+
+
+# A token made only of these characters counts as punctuation
+_PUNCTUATION = frozenset(string.punctuation + "،؛؟«»")  # + Persian punctuation
+# A phoneme string ending in one of these gives its last character to a trailing punctuation token
+_PHONEME_PUNCTUATION = string.punctuation
+
+# Markers in a _WordPlan split plan, next to the per-token phoneme shares
+_SPECIAL = None
+_REST = -1.0
+
+# Size of the raw word -> _WordPlan cache, per process
+WORD_PLAN_CACHE_SIZE = int(os.environ.get('WORD_PLAN_CACHE_SIZE', 200000))
+
+
+@lru_cache(maxsize=None)
+def _special_tokens(tokenizer):
+    # all_special_tokens is a property that builds a new list on every access
+    return frozenset(tokenizer.all_special_tokens)
+
+
+def _split_plan(tokens, input_ids, special_tokens):
+    """
+    (token id, share) per token: special tokens are marked _SPECIAL, the last token _REST,
+    the others get the fraction of the phonemes matching their share of the characters.
+    """
+    # we remove ## for length calc
+    total_char_len = sum(len(t.replace('##', '')) for t in tokens if t not in special_tokens)
+    if total_char_len == 0: total_char_len = 1 # Avoid div by zero
+
+    plan = []
+    for i, (token, token_id) in enumerate(zip(tokens, input_ids)):
+        if token in special_tokens:
+            plan.append((token_id, _SPECIAL))
+        elif i == len(tokens) - 1:
+            plan.append((token_id, _REST))
+        else:
+            plan.append((token_id, len(token.replace('##', '')) / total_char_len))
+    return tuple(plan)
+
+
+def _distribute(plan, phonemes, keep_special, input_ids, phonemes_list):
+    # Cut phonemes into consecutive parts following a _split_plan
+    current_phoneme_idx = 0
+    for token_id, share in plan:
+        if share is _SPECIAL:
+            if keep_special:
+                input_ids.append(token_id)
+                phonemes_list.append("") # No phoneme for special tokens usually
+            continue
+
+        if share == _REST:
+            # Last token gets the rest
+            phoneme_part = phonemes[current_phoneme_idx:]
+        else:
+            phoneme_len = int(len(phonemes) * share)
+            # Ensure at least 1 char if possible, unless it's empty
+            if phoneme_len == 0 and len(phonemes) > len(plan):
+                phoneme_len = 1
+            phoneme_part = phonemes[current_phoneme_idx : current_phoneme_idx + phoneme_len]
+            current_phoneme_idx += phoneme_len
+
+        input_ids.append(token_id)
+        phonemes_list.append(phoneme_part)
+
 
-def phonemize(text, tokenizer):
+class _WordPlan:
+    """
+    Tokenization of one raw word and how its phonemes are split over the tokens.
+    Built once per word (see _word_plan), so a repeated word skips the tokenizer.
+    """
+    __slots__ = ('tokens', 'input_ids', 'is_punct', 'word_plan', 'punct_plan')
+
+    def __init__(self, tokens, input_ids, special_tokens):
+        self.tokens = tuple(tokens)
+        self.input_ids = tuple(input_ids)
+        # punctuation-only or special tokens
+        self.is_punct = tuple(
+            all(c in _PUNCTUATION for c in t.replace('##', '')) or t in special_tokens for t in tokens
+        )
+        # all tokens share the phonemes, special tokens get nothing
+        self.word_plan = _split_plan(tokens, input_ids, special_tokens)
+        # a trailing punctuation token takes the last phoneme character, the others share the rest
+        self.punct_plan = None
+        if len(tokens) > 1 and self.is_punct[-1]:
+            self.punct_plan = _split_plan(tokens[:-1], input_ids[:-1], special_tokens)
+
+    def split(self, phonemes, input_ids, phonemes_list):
+        """Append the token ids of the word and their share of phonemes to the two lists."""
+        if len(self.input_ids) == 1:
+            input_ids.append(self.input_ids[0])
+            phonemes_list.append(phonemes)
+            return
+
+        if self.punct_plan is not None:
+            # Vaguye might map ':' to ',', so only the last phoneme character is checked
+            last_char = phonemes[-1] if phonemes else ''
+            if last_char in _PHONEME_PUNCTUATION:
+                _distribute(self.punct_plan, phonemes[:-1], True, input_ids, phonemes_list)
+                input_ids.append(self.input_ids[-1])
+                phonemes_list.append(last_char)
+                return
+
+        _distribute(self.word_plan, phonemes, False, input_ids, phonemes_list)
+
+
+def _build_word_plan(tokenizer, raw_word):
+    # the lexicon stores the token ids of its words, if it was built with this tokenizer
+    lexicon = get_lexicon()
+    if lexicon is not None and lexicon.matches(tokenizer):
+        entry = lexicon.get(raw_word)
+        if entry is not None:
+            token_ids = list(entry[1])
+            if not token_ids:
+                return None
+            return _WordPlan(tokenizer.convert_ids_to_tokens(token_ids), token_ids, _special_tokens(tokenizer))
+
+    tokens = tokenizer.tokenize(raw_word)
+    if not tokens:
+        return None
+    return _WordPlan(tokens, tokenizer.convert_tokens_to_ids(tokens), _special_tokens(tokenizer))
+
+
+_word_plan = lru_cache(maxsize=WORD_PLAN_CACHE_SIZE)(_build_word_plan)
+
+
+def word_plan_cache_info():
+    """Hits, misses, maxsize and current size of the word tokenization cache."""
+    return _word_plan.cache_info()
+
+
+def clear_caches():
+    """Empty the word phoneme and word tokenization caches of this process (e.g. for cold-cache benchmarks)."""
+    _cached_phonemize_word.cache_clear()
+    _word_plan.cache_clear()
+
+
+# The words of str.split(), with their position in the sentence
+_WORD_PATTERN = re.compile(r'\S+')
+
+
+def _offset_word_plans(tokenizer, sentences):
+    """
+    _WordPlan per whitespace word of each sentence (None for words without tokens).
+
+    Tokenizes all sentences in one call of a fast (Rust) tokenizer and groups the sub-tokens
+    back to their word by their character offsets. Gives the same tokens as tokenizing every
+    word on its own, since the tokenizer splits on whitespace first.
+    """
+    if not sentences:
+        return []
+    encodings = tokenizer(sentences, add_special_tokens=False, return_offsets_mapping=True,
+                          return_attention_mask=False, return_token_type_ids=False, verbose=False)
+    special_tokens = _special_tokens(tokenizer)
+
+    plans = {}
+    batch_plans = []
+    for i, sentence in enumerate(sentences):
+        tokens = encodings.tokens(i)
+        token_ids = encodings['input_ids'][i]
+        words = [(match.end(), match.group()) for match in _WORD_PATTERN.finditer(sentence)]
+
+        # token indices per word, tokens and words are both in sentence order
+        word_tokens = [[] for _ in words]
+        w = 0
+        for j, (start, _) in enumerate(encodings['offset_mapping'][i]):
+            while w < len(words) - 1 and words[w][0] <= start:
+                w += 1
+            word_tokens[w].append(j)
+
+        sentence_plans = []
+        for (_, word), indices in zip(words, word_tokens):
+            if not indices:
+                sentence_plans.append(None)
+                continue
+            if word not in plans:
+                plans[word] = _WordPlan([tokens[j] for j in indices], [token_ids[j] for j in indices], special_tokens)
+            sentence_plans.append(plans[word])
+        batch_plans.append(sentence_plans)
+    return batch_plans
+
+
+def _is_number_and(raw_words, idx):
+    # 'و' between two NUMBER_WORDS (no connectives) is read as 'o'
+    return (raw_words[idx] == "و" and 0 < idx < len(raw_words) - 1
+            and raw_words[idx-1] in NUMBER_WORDS and raw_words[idx+1] in NUMBER_WORDS)
+
+
+def phonemize(text, tokenizer=None, use_offsets=False):
     """
     Phonemize Persian text using vaguye phonemizer.
     Text is normalized using pernorm before tokenization and phonemization.
@@ -39,13 +723,18 @@ def phonemize(text, tokenizer):
     
     Args:
         text: Persian text string to phonemize
-        tokenizer: HuggingFace tokenizer (e.g., BertTokenizer for Persian)
+        tokenizer: HuggingFace tokenizer (e.g., BertTokenizer for Persian); None for the preloaded one
+        use_offsets: tokenize the whole sentence in one call (needs a fast tokenizer, e.g.
+            BertTokenizerFast) instead of word by word. Same output; pays off for long
+            sentences of mostly new words, while repeated words are cheaper from the word cache.
         
     Returns:
         dict with 'input_ids' and 'phonemes' keys
         - input_ids: list of token IDs from the tokenizer
         - phonemes: list of phoneme strings for each token
     """
+    tokenizer = _resolve_tokenizer(tokenizer)
+
     # Normalize the text first
     normalizer = get_normalizer()
     text = normalizer.normalize(text)
@@ -54,167 +743,27 @@ def phonemize(text, tokenizer):
     # We use simple split() because we want to preserve the chunks that tokenizer will process
     raw_words = text.split()
     
+    # Tokenize every word (cached per raw word), or the whole sentence at once
+    if use_offsets:
+        plans = _offset_word_plans(tokenizer, [text])[0]
+    else:
+        plans = [_word_plan(tokenizer, raw_word) for raw_word in raw_words]
+
     input_ids = []
     phonemes_list = []
-    
-    # Define number words to identify context for 'و' -> 'o'
-    ones = ["صفر", "یک", "دو", "سه", "چهار", "پنج", "شش", "هفت", "هشت", "نه"]
-    teens = ["ده", "یازده", "دوازده", "سیزده", "چهارده", "پانزده", "شانزده", "هفده", "هجده", "نوزده"]
-    tens = ["بیست", "سی", "چهل", "پنجاه", "شصت", "هفتاد", "هشتاد", "نود"]
-    hundreds = ["صد", "یکصد", "دویست", "سیصد", "چهارصد", "پانصد", "ششصد", "هفتصد", "هشتصد", "نهصد"]
-    scales = ["هزار", "میلیون", "میلیارد", "بیلیون", "تریلیون", "کوادریلیون"]
-    # We do NOT include 'و' or other connectives here, just the numbers themselves.
-    number_words = set(ones + teens + tens + hundreds + scales)
-
-    for idx, raw_word in enumerate(raw_words):
-        # Tokenize this specific word
-        word_tokens = tokenizer.tokenize(raw_word)
-        
-        if not word_tokens:
+
+    for idx, (raw_word, plan) in enumerate(zip(raw_words, plans)):
+        if plan is None:
             continue
             
-        # Phonemize the RAW word (preserves ZWNJ like in 'کتابخانه‌داری')
-        try:
-            phonemizer = get_phonemizer()
-            
-            # Check for 'و' between numbers
-            if raw_word == "و" and idx > 0 and idx < len(raw_words) - 1:
-                 prev_word = raw_words[idx-1]
-                 next_word = raw_words[idx+1]
-                 if prev_word in number_words and next_word in number_words:
-                     full_phoneme = "o"
-                 else:
-                     full_phoneme = phonemizer.phonemize(raw_word)
-            else:
-                full_phoneme = phonemizer.phonemize(raw_word)
-                
-            if not full_phoneme or full_phoneme.strip() == '':
-                full_phoneme = raw_word
-        except Exception as e:
-            full_phoneme = raw_word
-            
-        # Distribute phonemes to tokens
-        if len(word_tokens) == 1:
-            # Simple case
-            token_id = tokenizer.convert_tokens_to_ids(word_tokens[0])
-            input_ids.append(token_id)
-            phonemes_list.append(full_phoneme)
+        # The number 'و' depends on its neighbours, so it never goes through the word cache
+        if _is_number_and(raw_words, idx):
+            full_phoneme = "o"
         else:
-            # Complex case: Distribute full_phoneme across tokens
-            
-            # Identify punctuation tokens that shouldn't get word phonemes
-            # We assume punctuation tokens are at the end (suffix) or beginning (prefix)
-            # But typically tokenizer splits punctuation as separate tokens
-            
-            is_punct = []
-            import string
-            # Add Persian punctuation
-            persian_punct = "،؛؟«»"
-            all_punct = string.punctuation + persian_punct
+            full_phoneme = phonemize_word(raw_word)
             
-            for t in word_tokens:
-                # Check if token is purely punctuation or a special token
-                t_text = t.replace('##', '')
-                is_p = all(c in all_punct for c in t_text) or t in tokenizer.all_special_tokens
-                is_punct.append(is_p)
-            
-            # Special handling: if the last token is punctuation and the phoneme string ends with punctuation
-            # we want to assign that punctuation phoneme to the last token.
-            
-            # Check if we have a trailing punctuation token
-            if is_punct[-1] and len(word_tokens) > 1:
-                # Check if phoneme string ends with punctuation (e.g. ',')
-                # We need to be careful. Vaguye might map ':' to ','
-                # Let's check the last char.
-                last_char = full_phoneme[-1] if full_phoneme else ''
-                if last_char in string.punctuation:
-                    # Split the phoneme
-                    word_phoneme_part = full_phoneme[:-1]
-                    punct_phoneme_part = last_char
-                    
-                    # Assign to last token
-                    # But we need to handle the rest of the tokens
-                    
-                    # Recalculate distribution for the NON-last tokens
-                    tokens_to_distribute = word_tokens[:-1]
-                    
-                    # Filter out special tokens for length calculation
-                    valid_tokens = [t for t in tokens_to_distribute if t not in tokenizer.all_special_tokens]
-                    total_char_len = sum(len(t.replace('##', '')) for t in valid_tokens)
-                    if total_char_len == 0: total_char_len = 1
-                    
-                    current_phoneme_idx = 0
-                    
-                    for i, token in enumerate(tokens_to_distribute):
-                        if token in tokenizer.all_special_tokens:
-                            input_ids.append(tokenizer.convert_tokens_to_ids(token))
-                            phonemes_list.append("") # No phoneme for special tokens usually
-                            continue
-                            
-                        token_text = token.replace('##', '')
-                        token_len = len(token_text)
-                        
-                        if i == len(tokens_to_distribute) - 1:
-                            # Last word token gets the rest of the WORD phoneme part
-                            phoneme_part = word_phoneme_part[current_phoneme_idx:]
-                        else:
-                            proportion = token_len / total_char_len
-                            phoneme_len = int(len(word_phoneme_part) * proportion)
-                            if phoneme_len == 0 and len(word_phoneme_part) > len(tokens_to_distribute):
-                                phoneme_len = 1
-                            phoneme_part = word_phoneme_part[current_phoneme_idx : current_phoneme_idx + phoneme_len]
-                            current_phoneme_idx += phoneme_len
-                        
-                        input_ids.append(tokenizer.convert_tokens_to_ids(token))
-                        phonemes_list.append(phoneme_part)
-                    
-                    # Append the punctuation token
-                    input_ids.append(tokenizer.convert_tokens_to_ids(word_tokens[-1]))
-                    phonemes_list.append(punct_phoneme_part)
-                    continue
-
-            # Fallback to original logic if not matching the specific case above
-            # (or extend logic for other cases if needed)
-            
-            # Filter out special tokens for length calculation
-            valid_tokens = [t for t in word_tokens if t not in tokenizer.all_special_tokens]
-            
-            # Calculate total character length of the text parts of tokens
-            # Note: we remove ## for length calc
-            total_char_len = sum(len(t.replace('##', '')) for t in valid_tokens)
-            
-            if total_char_len == 0: total_char_len = 1 # Avoid div by zero
-            
-            current_phoneme_idx = 0
-            
-            for i, token in enumerate(word_tokens):
-                if token in tokenizer.all_special_tokens:
-                    continue
-                    
-                token_text = token.replace('##', '')
-                token_len = len(token_text)
-                
-                # If token is punctuation, it might not have phonemes or might be separate
-                # For simplicity, we treat punctuation as having length 1 or its char length
-                
-                # Calculate proportion
-                if i == len(word_tokens) - 1:
-                    # Last token gets the rest
-                    phoneme_part = full_phoneme[current_phoneme_idx:]
-                else:
-                    proportion = token_len / total_char_len
-                    phoneme_len = int(len(full_phoneme) * proportion)
-                    
-                    # Ensure at least 1 char if possible, unless it's empty
-                    if phoneme_len == 0 and len(full_phoneme) > len(word_tokens):
-                        phoneme_len = 1
-                        
-                    phoneme_part = full_phoneme[current_phoneme_idx : current_phoneme_idx + phoneme_len]
-                    current_phoneme_idx += phoneme_len
-                
-                token_id = tokenizer.convert_tokens_to_ids(token)
-                input_ids.append(token_id)
-                phonemes_list.append(phoneme_part)
+        # Distribute phonemes to tokens
+        plan.split(full_phoneme, input_ids, phonemes_list)
                 
     return {
         'input_ids': input_ids,
@@ -222,6 +771,201 @@ def phonemize(text, tokenizer):
     }
 
 
+def phonemize_batch(texts, tokenizer=None, column='text', use_offsets=False):
+    """
+    Phonemize many texts, tokenizing and phonemizing each distinct word of the batch only once.
+    Gives the same result as phonemize() on every text.
+
+    Can be passed directly to Dataset.map:
+        dataset.map(phonemize_batch, batched=True, fn_kwargs={'tokenizer': tokenizer}, remove_columns=['text'])
+    or, in phonemize_pool workers (or after preload), without hashing the tokenizer for every map:
+        dataset.map(phonemize_batch, batched=True, remove_columns=['text'])
+
+    Args:
+        texts: list of Persian texts, or a Dataset.map batch (mapping of columns)
+        tokenizer: HuggingFace tokenizer (e.g., BertTokenizer for Persian); None for the preloaded one
+        column: the text column when texts is a batch dict
+        use_offsets: tokenize all sentences in one fast-tokenizer call, see phonemize()
+
+    Returns:
+        dict with 'input_ids' and 'phonemes' keys, each a list with one entry per text
+    """
+    if isinstance(texts, Mapping):
+        texts = texts[column]
+    tokenizer = _resolve_tokenizer(tokenizer)
+
+    normalizer = get_normalizer()
+    normalized = [normalizer.normalize(text) for text in texts]
+    sentences = [text.split() for text in normalized]
+
+    # every distinct word once: its tokenization, and its phonemes unless it is only ever a number 'و'
+    if use_offsets:
+        sentence_plans = _offset_word_plans(tokenizer, normalized)
+    else:
+        plans = {}
+        for raw_words in sentences:
+            for raw_word in raw_words:
+                if raw_word not in plans:
+                    plans[raw_word] = _word_plan(tokenizer, raw_word)
+        sentence_plans = [[plans[raw_word] for raw_word in raw_words] for raw_words in sentences]
+
+    word_phonemes = {}
+    for raw_words, word_plans in zip(sentences, sentence_plans):
+        for idx, (raw_word, plan) in enumerate(zip(raw_words, word_plans)):
+            if raw_word not in word_phonemes and plan is not None and not _is_number_and(raw_words, idx):
+                word_phonemes[raw_word] = phonemize_word(raw_word)
+
+    batch_input_ids = []
+    batch_phonemes = []
+    for raw_words, word_plans in zip(sentences, sentence_plans):
+        input_ids = []
+        phonemes_list = []
+        for idx, (raw_word, plan) in enumerate(zip(raw_words, word_plans)):
+            if plan is None:
+                continue
+            full_phoneme = "o" if _is_number_and(raw_words, idx) else word_phonemes[raw_word]
+            plan.split(full_phoneme, input_ids, phonemes_list)
+        batch_input_ids.append(input_ids)
+        batch_phonemes.append(phonemes_list)
+
+    # pool workers can be killed between batches, so new shared phonemes are written per batch
+    flush_shared_cache()
+
+    return {
+        'input_ids': batch_input_ids,
+        'phonemes': batch_phonemes
+    }
+
+
+def profile_phonemize(texts, tokenizer=None):
+    """
+    Run the steps of phonemize() stage by stage over all texts, with cold caches, to see where
+    the time goes.
+
+    Returns:
+        (seconds per stage: normalize, tokenize, phonemize, distribute; the phonemize() results)
+    """
+    tokenizer = _resolve_tokenizer(tokenizer)
+    clear_caches()
+    times = {}
+
+    start = time.perf_counter()
+    normalizer = get_normalizer()
+    sentences = [normalizer.normalize(text).split() for text in texts]
+    times['normalize'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plans = [[_word_plan(tokenizer, raw_word) for raw_word in raw_words] for raw_words in sentences]
+    times['tokenize'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    phonemes = [[None if plan is None else "o" if _is_number_and(raw_words, idx) else phonemize_word(raw_word)
+                 for idx, (raw_word, plan) in enumerate(zip(raw_words, word_plans))]
+                for raw_words, word_plans in zip(sentences, plans)]
+    times['phonemize'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = []
+    for word_plans, word_phonemes in zip(plans, phonemes):
+        input_ids = []
+        phonemes_list = []
+        for plan, full_phoneme in zip(word_plans, word_phonemes):
+            if plan is not None:
+                plan.split(full_phoneme, input_ids, phonemes_list)
+        results.append({'input_ids': input_ids, 'phonemes': phonemes_list})
+    times['distribute'] = time.perf_counter() - start
+    return times, results
+
+
+def preload(tokenizer=None):
+    """
+    Build the phonemizer, normalizer, lexicon and shared cache of this process now instead of
+    on first use, and make tokenizer the default of phonemize() and phonemize_batch().
+
+    Returns:
+        seconds it took
+    """
+    global _global_tokenizer
+    start = time.perf_counter()
+    if tokenizer is not None:
+        _global_tokenizer = tokenizer
+    get_phonemizer()
+    get_normalizer()
+    get_lexicon()
+    get_shared_cache()
+    get_phonemizer_supervisor()
+    return time.perf_counter() - start
+
+
+# Startup timing of this pool worker, see phonemize_pool
+_worker_startup = None
+
+
+def _init_pool_worker(state, pool_start):
+    global _global_tokenizer, _global_lexicon, _lexicon_checked, _global_shared_cache, _global_supervisor, _worker_startup
+    start = time.perf_counter()
+    if state is not None:
+        # not forked: build what the parent had, the phonemizer and normalizer are loaded here
+        _global_tokenizer, lexicon, shared_cache, supervisor = state
+        _global_lexicon = lexicon if lexicon is not None else False
+        _lexicon_checked = False
+        _global_shared_cache = shared_cache if shared_cache is not None else False
+        _global_supervisor = supervisor if supervisor is not None else False
+    preload()
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.connection  # open this worker's own connection
+    _worker_startup = {
+        'pid': os.getpid(),
+        'init_seconds': time.perf_counter() - start,
+        'since_pool_start': time.time() - pool_start,
+    }
+    print(f"Phonemizer worker {_worker_startup['pid']} ready: initializer {_worker_startup['init_seconds']:.3f}s, "
+          f"{_worker_startup['since_pool_start']:.3f}s after the pool was created")
+
+
+def worker_startup_info():
+    """Startup timing of the current phonemize_pool worker (None outside of one)."""
+    return _worker_startup
+
+
+def phonemize_pool(tokenizer, max_workers=None, pool_class=None, **pool_kwargs):
+    """
+    Process pool whose workers start with tokenizer, normalizer and phonemizer already loaded.
+
+    They are built once, here in the parent. With the fork start method (Linux) workers inherit
+    them copy-on-write; elsewhere each worker builds its own in the pool initializer, once.
+    Tasks call phonemize_batch() without a tokenizer. Each worker prints its startup timing
+    (also available in the worker through worker_startup_info()).
+
+    Example:
+        with phonemize_pool(tokenizer, 26, pool_class=pebble.ProcessPool) as pool:
+            pool.map(process_shard, range(num_shards), timeout=2000)
+
+    Args:
+        tokenizer: HuggingFace tokenizer the workers phonemize with
+        max_workers: number of worker processes (None for one per CPU)
+        pool_class: concurrent.futures.ProcessPoolExecutor (default) or pebble.ProcessPool
+        **pool_kwargs: further pool_class arguments, e.g. max_tasks for pebble
+
+    Returns:
+        the pool, to be used as a context manager
+    """
+    print(f"Preloaded tokenizer, normalizer and phonemizer in {preload(tokenizer):.3f}s")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if fork else None)
+    state = None if fork else (tokenizer, get_lexicon(), get_shared_cache(), get_phonemizer_supervisor())
+    initargs = (state, time.time())
+
+    if pool_class is None:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                   initializer=_init_pool_worker, initargs=initargs)
+    return pool_class(max_workers=max_workers, context=context,
+                      initializer=_init_pool_worker, initargs=initargs, **pool_kwargs)
+
+
 if __name__ == "__main__":
     # Test the phonemizer
     from transformers import BertTokenizer
@@ -241,3 +985,10 @@ if __name__ == "__main__":
         print(f"Tokens: {len(result['input_ids'])}")
         print(f"Input IDs: {result['input_ids'][:10]}...")  # First 10
         print(f"Phonemes: {result['phonemes'][:10]}...")  # First 10
+
+    batch = phonemize_batch(test_sentences, tokenizer)
+    same = batch['phonemes'] == [phonemize(sentence, tokenizer)['phonemes'] for sentence in test_sentences]
+    print(f"\nphonemize_batch matches phonemize: {same}")
+
+    print(f"Phoneme cache: {phoneme_cache_info()}")
+    print(f"Word plan cache: {word_plan_cache_info()}")